@@ -1,14 +1,23 @@
 import os
+import re
+import math
 import json
-import requests
-from datetime import datetime
-from flask import Flask, render_template, request, jsonify
+import uuid
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
-from alpaca.trading.client import TradingClient
-from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.requests import StockBarsRequest
-from alpaca.data.timeframe import TimeFrame
+
+# The Alpaca SDK, requests and numpy are imported inside the functions that use
+# them so that importing this module (and respawning workers) stays fast.
+# Call warm_up() to pay those costs before the first request instead.
 
 # Load environment variables
 load_dotenv()
@@ -19,27 +28,219 @@ CORS(app)
 # Global asset cache for symbol -> company name
 asset_name_cache = {}
 asset_cache_built = False
+asset_cache_lock = threading.Lock()
+
+# Search index over the asset universe, rebuilt together with asset_name_cache
+symbol_index = None
 
 # Watchlist storage (in production, use a proper database)
 WATCHLIST_FILE = 'watchlist.json'
+# Held for every load -> modify -> save of the watchlist file
+watchlist_lock = threading.Lock()
+
+# Named Alpaca account profiles (in addition to the default keys in .env)
+ACCOUNTS_FILE = 'accounts.json'
+
+# Trading clients keyed by (profile name, api key, secret key, paper), reused across requests
+trading_client_pool = {}
+client_pool_lock = threading.Lock()
+
+# Recent portfolio snapshots (version -> row hashes, weights and account fields) for incremental updates
+MAX_PORTFOLIO_SNAPSHOTS = 32
+portfolio_snapshots = OrderedDict()
+portfolio_snapshots_lock = threading.Lock()
+
+# Struct-of-arrays table of held positions; derived fields are recomputed only for rows whose price moved.
+# Weights depend on the whole portfolio, so they are kept out of the per-row output and sent as a separate map.
+POSITION_OUTPUT_FIELDS = [
+    'current_price', 'market_value', 'avg_entry_price', 'cost_basis', 'todays_pl', 'todays_pl_pc',
+    'total_pl', 'total_pl_pc', 'target_distance_pc'
+]
+position_table = None
+position_table_lock = threading.Lock()
+
+# Bumped on every watchlist save so derived target distances know when to refresh
+watchlist_revision = 0
+
+# Citation and search-result store
+RESEARCH_DB = 'research.db'
+research_db_ready = False
+
+# Batch AI analysis settings and recent results (symbol -> {'ai_analysis', 'analysis_date'})
+BATCH_ANALYSIS_WORKERS = int(os.getenv('BATCH_ANALYSIS_WORKERS', '4'))
+AI_ANALYSIS_MAX_AGE = timedelta(hours=float(os.getenv('AI_ANALYSIS_MAX_AGE_HOURS', '24')))
+analysis_cache = {}
+analysis_in_flight = set()
+analysis_lock = threading.Lock()
 
 def build_asset_cache():
-    global asset_name_cache, asset_cache_built
+    global asset_name_cache, asset_cache_built, symbol_index
     if asset_cache_built:
         return
-    trading_client = get_trading_client()
-    if trading_client:
-        try:
-            # Get all assets - alpaca-py doesn't use status parameter
-            assets = trading_client.get_all_assets()
-            # Filter for active US equities
-            asset_name_cache = {a.symbol: a.name for a in assets if a.name and a.status == 'active' and a.asset_class == 'us_equity'}
-            asset_cache_built = True
-            print(f"Asset cache built with {len(asset_name_cache)} companies")
-        except Exception as e:
-            print(f"Error building asset cache: {e}")
-            asset_name_cache = {}
-            asset_cache_built = False
+    # Concurrent callers wait for a single fetch of the asset list
+    with asset_cache_lock:
+        if asset_cache_built:
+            return
+        trading_client = get_trading_client()
+        if trading_client:
+            try:
+                # Get all assets - alpaca-py doesn't use status parameter
+                assets = trading_client.get_all_assets()
+                # Filter for active US equities
+                names = {a.symbol: a.name for a in assets if a.name and a.status == 'active' and a.asset_class == 'us_equity'}
+                # Build the search index before publishing so readers never see a half-built one
+                index = build_symbol_index(names)
+                asset_name_cache, symbol_index = names, index
+                asset_cache_built = True
+                print(f"Asset cache built with {len(asset_name_cache)} companies")
+            except Exception as e:
+                print(f"Error building asset cache: {e}")
+                asset_name_cache = {}
+                symbol_index = None
+                asset_cache_built = False
+
+def tokenize_name(name):
+    """Split a company name into uppercase alphanumeric tokens"""
+    return [token for token in re.split(r'[^A-Z0-9]+', name.upper()) if token]
+
+def ticker_key(text):
+    """Ticker with separators removed, so BRK.B, BRK-B, BRK B and BRKB all match"""
+    return re.sub(r'[\s.\-/]+', '', text.upper())
+
+def build_symbol_index(names):
+    """Precompute ranked symbol lists for every ticker prefix and name-word prefix.
+
+    Each list is already in rank order, so a search walks at most a few
+    entries per keystroke instead of collecting and sorting every match.
+    """
+    ticker_entries = (
+        (ticker_key(symbol), symbol, (len(ticker_key(symbol)), len(name), symbol))
+        for symbol, name in names.items()
+    )
+    name_entries = (
+        (token, symbol, (0 if position == 0 else 1, position, len(name), symbol))
+        for symbol, name in names.items()
+        for position, token in enumerate(tokenize_name(name))
+    )
+    tokens = {symbol: tuple(tokenize_name(name)) for symbol, name in names.items()}
+    words = {}
+    for symbol, name_tokens in tokens.items():
+        for token in name_tokens:
+            words.setdefault(token, set()).add(symbol)
+    return {
+        'names': names,
+        'tokens': tokens,
+        'ticker_prefixes': _ranked_prefix_lists(ticker_entries),
+        'name_prefixes': _ranked_prefix_lists(name_entries),
+        # Symbols whose name contains each whole word, for scoring later query words
+        'words': {token: frozenset(symbols) for token, symbols in words.items()},
+        # Membership sets for multi-word queries, filled on first use
+        'prefix_sets': {}
+    }
+
+def _ranked_prefix_lists(entries):
+    """Map every prefix of each key to its symbols in rank order.
+
+    entries yields (key, symbol, rank); a symbol keeps its best rank per prefix.
+    """
+    best = {}
+    for key, symbol, rank in entries:
+        for end in range(1, len(key) + 1):
+            ranks = best.setdefault(key[:end], {})
+            if symbol not in ranks or rank < ranks[symbol]:
+                ranks[symbol] = rank
+    return {prefix: tuple(sorted(ranks, key=ranks.get)) for prefix, ranks in best.items()}
+
+def _prefix_set(index, prefix):
+    """Set of symbols with a name word starting with prefix"""
+    members = index['prefix_sets'].get(prefix)
+    if members is None:
+        members = frozenset(index['name_prefixes'].get(prefix, ()))
+        index['prefix_sets'][prefix] = members
+    return members
+
+def _rank_multi_word(index, query_tokens, limit):
+    """Symbols whose name matches every query word, best first.
+
+    Candidates are ordered by how many later query words they contain as whole
+    words, then by their rank for the first word, so "alphabet class a" puts
+    Class A ahead of Class C.
+    """
+    names = index['names']
+    tokens = index['tokens']
+    first_word = query_tokens[0]
+    first = index['name_prefixes'].get(first_word, ())
+    unique_tokens = list(dict.fromkeys(query_tokens))
+    candidates = frozenset.intersection(*sorted(
+        (_prefix_set(index, token) for token in unique_tokens), key=len
+    ))
+    
+    def name_rank(symbol):
+        position = next(i for i, t in enumerate(tokens[symbol]) if t.startswith(first_word))
+        return (0 if position == 0 else 1, position, len(names[symbol]), symbol)
+    
+    def in_rank_order(members):
+        # A small group is cheaper to rank directly than to find in the first word's long list
+        if len(members) * 20 < len(first):
+            return sorted(members, key=name_rank)
+        return (symbol for symbol in first if symbol in members)
+    
+    # Whole-word matches of later words; a word every candidate contains does not change the order
+    hits = {}
+    for token in unique_tokens[1:]:
+        matched = index['words'].get(token, frozenset()) & candidates
+        if len(matched) < len(candidates):
+            for symbol in matched:
+                hits[symbol] = hits.get(symbol, 0) + 1
+    
+    groups = [
+        {symbol for symbol, count in hits.items() if count == score}
+        for score in sorted(set(hits.values()), reverse=True)
+    ]
+    groups.append(candidates.difference(hits) if hits else candidates)
+    
+    results = []
+    for members in groups:
+        for symbol in in_rank_order(members):
+            if len(results) >= limit:
+                return results
+            results.append(symbol)
+    return results
+
+def search_symbols(query, limit=10):
+    """Return the top matches for a partial ticker or company name.
+
+    Ranking: exact ticker, ticker prefix, name starting with the query,
+    then names containing words that start with each query word.
+    """
+    index = symbol_index
+    if not index or not query:
+        return []
+    names = index['names']
+    ticker_query = ticker_key(query)
+    query_tokens = tokenize_name(query)
+    results = []
+    seen = set()
+
+    def take(symbols):
+        for symbol in symbols:
+            if len(results) >= limit:
+                return
+            if symbol not in seen:
+                seen.add(symbol)
+                results.append(symbol)
+
+    # Ticker matches: exact first, then shorter tickers ahead of longer ones
+    take(index['ticker_prefixes'].get(ticker_query, ()))
+
+    # Name matches come after ticker matches; every query word must prefix-match some word of the name
+    if query_tokens and len(ticker_query) >= 2 and len(results) < limit:
+        if len(query_tokens) == 1:
+            take(index['name_prefixes'].get(query_tokens[0], ()))
+        else:
+            take(_rank_multi_word(index, query_tokens, limit))
+
+    return [{'symbol': symbol, 'company': names[symbol]} for symbol in results]
 
 def get_trading_client():
     """Get Alpaca Trading client if keys are configured"""
@@ -54,35 +255,105 @@ def get_trading_client():
     print(f"Secret Key length: {len(secret_key) if secret_key else 0}")
     
     if api_key and secret_key:
+        # Verified once per key pair, then reused from the pool
+        return get_pooled_client({'name': 'default', 'api_key': api_key, 'secret_key': secret_key, 'paper': None})
+    return None
+
+def connect_trading_client(api_key, secret_key, paper=None):
+    """Create and verify a Trading client; paper=None tries live then paper"""
+    from alpaca.trading.client import TradingClient
+    
+    for use_paper in ([False, True] if paper is None else [bool(paper)]):
+        mode = 'Paper Trading' if use_paper else 'Live Trading'
         try:
-            # Try with live trading first (since user has live trading keys)
-            client = TradingClient(api_key, secret_key, paper=False)
+            client = TradingClient(api_key, secret_key, paper=use_paper)
             # Test the connection
-            account = client.get_account()
-            print(f"Successfully connected to Alpaca (Live Trading)")
+            client.get_account()
+            print(f"Successfully connected to Alpaca ({mode})")
             return client
         except Exception as e:
-            print(f"Live trading failed: {str(e)}")
-            try:
-                # Try with paper trading as fallback
-                client = TradingClient(api_key, secret_key, paper=True)
-                account = client.get_account()
-                print(f"Successfully connected to Alpaca (Paper Trading)")
-                return client
-            except Exception as e2:
-                print(f"Paper trading also failed: {str(e2)}")
-                return None
+            print(f"{mode} connection failed: {str(e)}")
     return None
 
+def load_account_profiles():
+    """Load named account profiles from JSON file"""
+    try:
+        if os.path.exists(ACCOUNTS_FILE):
+            with open(ACCOUNTS_FILE, 'r') as f:
+                return json.load(f)
+        return []
+    except Exception as e:
+        print(f"Error loading account profiles: {e}")
+        return []
+
+def save_account_profiles(profiles):
+    """Save named account profiles to JSON file"""
+    try:
+        with open(ACCOUNTS_FILE, 'w') as f:
+            json.dump(profiles, f, indent=2)
+        return True
+    except Exception as e:
+        print(f"Error saving account profiles: {e}")
+        return False
+
+def get_account_profiles():
+    """All configured profiles, starting with the default .env keys if present"""
+    profiles = []
+    api_key = os.getenv('ALPACA_API_KEY', '').strip()
+    secret_key = os.getenv('ALPACA_SECRET_KEY', '').strip()
+    if api_key and secret_key:
+        profiles.append({'name': 'default', 'api_key': api_key, 'secret_key': secret_key, 'paper': None})
+    profiles.extend(p for p in load_account_profiles() if p.get('name') not in ('default', 'data'))
+    return profiles
+
+def get_pooled_client(profile):
+    """Get the pooled Trading client for a profile, connecting on first use"""
+    pool_key = (profile['name'], profile['api_key'], profile['secret_key'], profile.get('paper'))
+    with client_pool_lock:
+        client = trading_client_pool.get(pool_key)
+    if client is None:
+        client = connect_trading_client(profile['api_key'], profile['secret_key'], profile.get('paper'))
+        if client:
+            with client_pool_lock:
+                trading_client_pool[pool_key] = client
+    return client
+
+def drop_pooled_clients(name):
+    """Forget pooled clients for a profile after its keys change"""
+    with client_pool_lock:
+        for pool_key in [k for k in trading_client_pool if k[0] == name]:
+            del trading_client_pool[pool_key]
+
 def get_data_client():
     """Get Alpaca Data client for market data"""
     api_key = os.getenv('ALPACA_API_KEY')
     secret_key = os.getenv('ALPACA_SECRET_KEY')
     
     if api_key and secret_key:
-        return StockHistoricalDataClient(api_key, secret_key)
+        pool_key = ('data', api_key, secret_key)
+        with client_pool_lock:
+            client = trading_client_pool.get(pool_key)
+        if client is None:
+            from alpaca.data.historical import StockHistoricalDataClient
+            client = StockHistoricalDataClient(api_key, secret_key)
+            with client_pool_lock:
+                trading_client_pool[pool_key] = client
+        return client
     return None
 
+def warm_up():
+    """Import deferred modules and connect clients ahead of the first request"""
+    import requests
+    import numpy
+    import alpaca.trading.client
+    import alpaca.data.historical
+    import alpaca.data.requests
+    import alpaca.data.timeframe
+    
+    if get_trading_client():
+        get_data_client()
+        build_asset_cache()
+
 def get_company_name(symbol):
     """Get company name from Alpaca asset cache, fallback to formatted symbol."""
     if not asset_cache_built:
@@ -126,6 +397,10 @@ FLASK_DEBUG="True"
         # Reload environment variables
         load_dotenv(override=True)
         
+        # Force a fresh, verified connection with the submitted keys
+        drop_pooled_clients('default')
+        drop_pooled_clients('data')
+        
         # Test Alpaca connection
         api = get_trading_client()
         if api:
@@ -173,71 +448,439 @@ def get_portfolio():
         cash = float(account.cash)
         positions_value = total_value - cash
         
-        # Format positions data
-        formatted_positions = []
-        for position in positions:
-            # Get current price for the symbol
+        # Use Alpaca's data API for current prices, one request for all symbols
+        latest_prices = {}
+        if data_client and positions:
             try:
-                if data_client:
-                    # Use Alpaca's data API for current price
-                    bars_request = StockBarsRequest(
-                        symbol_or_symbols=position.symbol,
-                        timeframe=TimeFrame.Day,
-                        limit=1
-                    )
-                    bars = data_client.get_stock_bars(bars_request)
-                    if bars and bars.data:
-                        current_price = float(bars.data[position.symbol][0].close)
-                    else:
-                        current_price = float(position.current_price)
-                else:
-                    current_price = float(position.current_price)
-            except:
-                current_price = float(position.current_price)
-            
-            # Calculate change
-            avg_entry_price = float(position.avg_entry_price)
-            change_percent = ((current_price - avg_entry_price) / avg_entry_price) * 100
-            
-            # Handle fractional shares properly
+                latest_prices = get_latest_prices(data_client, [p.symbol for p in positions])
+            except Exception as e:
+                print(f"Error fetching latest prices: {e}")
+        
+        # Only rows whose price moved are recomputed and re-serialized
+        with position_table_lock:
+            table = sync_position_table(positions, latest_prices)
+            formatted_positions = list(table['rows'])
+            row_hashes = dict(zip(table['symbols'], table['row_hashes']))
+            weights = dict(zip(table['symbols'], table['weight_pc'].round(2).tolist()))
+            order = table['order']
+        
+        account_data = {
+            'total_value': round(total_value, 2),
+            'cash': round(cash, 2),
+            'positions_value': round(positions_value, 2),
+            'buying_power': round(float(account.buying_power), 2),
+            'day_trade_count': int(float(account.daytrade_count)) if account.daytrade_count else 0,
+            'status': account.status,
+            'currency': account.currency
+        }
+        
+        # Clients holding a known version get a 304 or only the rows that changed
+        since = request.args.get('since')
+        snapshot, previous = record_portfolio_snapshot(account_data, row_hashes, weights, since)
+        
+        if since and since == snapshot['version']:
+            response = app.response_class(status=304)
+        elif previous:
+            response = jsonify({
+                'version': snapshot['version'],
+                'base_version': since,
+                'diff': build_portfolio_diff(previous, snapshot, account_data, formatted_positions),
+                'last_updated': datetime.now().isoformat()
+            })
+        else:
+            response = jsonify({
+                'version': snapshot['version'],
+                'account': account_data,
+                # Sorted by value (highest first)
+                'positions': [formatted_positions[i] for i in order],
+                'weights': weights,
+                'last_updated': datetime.now().isoformat()
+            })
+        
+        # Create response with cache-busting headers
+        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '0'
+        
+        return response
+        
+    except Exception as e:
+        print(f"Portfolio error: {str(e)}")
+        return jsonify({'error': f'Failed to fetch portfolio data: {str(e)}'}), 500
+
+def load_watchlist_targets():
+    """Map symbol -> target price for watchlist items that have one"""
+    targets = {}
+    for item in load_watchlist():
+        target = to_float(item.get('target_price'), None)
+        if target:
+            targets[item.get('symbol', '').upper()] = target
+    return targets
+
+def build_position_table(positions, prices):
+    """Parse Alpaca positions once into column arrays"""
+    import numpy as np
+    
+    quantities = []
+    for position in positions:
+        # Handle fractional shares properly
+        quantity = to_float(position.qty, None)
+        if quantity is None:
+            print(f"Warning: Could not parse quantity for {position.symbol}. Value was: {position.qty}")
+            quantity = 0.0
+        quantities.append(quantity)
+    
+    symbols = [p.symbol for p in positions]
+    targets = load_watchlist_targets()
+    table = {
+        'structure': position_structure(positions),
+        'symbols': symbols,
+        'companies': [get_company_name(symbol) for symbol in symbols],
+        'quantity': np.array(quantities, dtype=float),
+        'avg_entry_price': np.array([to_float(p.avg_entry_price) for p in positions], dtype=float),
+        'cost_basis': np.array([to_float(p.cost_basis) for p in positions], dtype=float),
+        'lastday_price': np.array([to_float(p.lastday_price) for p in positions], dtype=float),
+        'current_price': prices,
+        'target_price': np.array([targets.get(symbol, np.nan) for symbol in symbols], dtype=float),
+        'watchlist_revision': watchlist_revision
+    }
+    n = len(symbols)
+    for field in POSITION_OUTPUT_FIELDS + ['weight_pc']:
+        table.setdefault(field, np.zeros(n))
+    # Infinity never equals a rounded value, so the first pass serializes every row
+    table['rounded'] = np.full((n, len(POSITION_OUTPUT_FIELDS)), np.inf)
+    table['rows'] = [None] * n
+    table['row_hashes'] = [None] * n
+    table['order'] = []
+    recompute_position_rows(table, np.arange(n))
+    return table
+
+def position_structure(positions):
+    """Everything about the positions except price; a change here means rebuilding the table"""
+    return [(p.symbol, p.qty, p.avg_entry_price, p.cost_basis, p.lastday_price) for p in positions]
+
+def recompute_position_rows(table, rows):
+    """Vectorized update of derived fields for the given row indices.
+
+    Weights depend on the portfolio total, so they are refreshed for every row;
+    they are not part of the row output, so only rows whose own rounded fields
+    changed are re-serialized and re-hashed.
+    """
+    import numpy as np
+    
+    q = table['quantity'][rows]
+    price = table['current_price'][rows]
+    cost = table['cost_basis'][rows]
+    lastday = table['lastday_price'][rows]
+    target = table['target_price'][rows]
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        market_value = q * price
+        table['market_value'][rows] = market_value
+        table['todays_pl'][rows] = q * (price - lastday)
+        table['todays_pl_pc'][rows] = np.where(lastday != 0, (price / lastday - 1) * 100, 0.0)
+        table['total_pl'][rows] = market_value - cost
+        table['total_pl_pc'][rows] = np.where(cost != 0, (market_value - cost) / np.abs(cost) * 100, 0.0)
+        table['target_distance_pc'][rows] = np.where(price != 0, (target / price - 1) * 100, np.nan)
+        
+        total_market_value = np.abs(table['market_value']).sum()
+        table['weight_pc'][:] = table['market_value'] / total_market_value * 100 if total_market_value else 0.0
+    
+    rounded = np.round(np.column_stack([table[field] for field in POSITION_OUTPUT_FIELDS]), 2)
+    previous = table['rounded']
+    unchanged = (rounded == previous) | (np.isnan(rounded) & np.isnan(previous))
+    changed = np.flatnonzero(~unchanged.all(axis=1)) if len(rounded) else []
+    
+    for i in changed:
+        row = {
+            'symbol': table['symbols'][i],
+            'company': table['companies'][i],
+            'quantity': float(table['quantity'][i])
+        }
+        for field, value in zip(POSITION_OUTPUT_FIELDS, rounded[i].tolist()):
+            row[field] = None if value != value else value
+        table['rows'][i] = row
+        table['row_hashes'][i] = hash_row(row)
+    table['rounded'] = rounded
+    
+    if len(changed):
+        table['order'] = np.argsort(-table['market_value'], kind='stable').tolist()
+    return changed
+
+def update_position_prices(table, prices_by_symbol):
+    """Apply new prices to the table, recomputing only rows whose price moved"""
+    import numpy as np
+    
+    index = table.setdefault('index', {symbol: i for i, symbol in enumerate(table['symbols'])})
+    rows = np.array([index[s] for s in prices_by_symbol if s in index], dtype=int)
+    if len(rows) == 0:
+        return []
+    new_prices = np.array([prices_by_symbol[table['symbols'][i]] for i in rows], dtype=float)
+    moved = new_prices != table['current_price'][rows]
+    rows = rows[moved]
+    if len(rows) == 0:
+        return []
+    table['current_price'][rows] = new_prices[moved]
+    return recompute_position_rows(table, rows)
+
+def sync_position_table(positions, latest_prices):
+    """Bring the shared position table in line with the latest Alpaca positions.
+
+    Trades or a new trading day rebuild the table; otherwise only price ticks are applied.
+    Callers must hold position_table_lock.
+    """
+    import numpy as np
+    global position_table
+    
+    prices = {p.symbol: latest_prices.get(p.symbol, to_float(p.current_price)) for p in positions}
+    if position_table is None or position_table['structure'] != position_structure(positions):
+        position_table = build_position_table(
+            positions, np.array([prices[p.symbol] for p in positions], dtype=float)
+        )
+        return position_table
+    
+    if position_table['watchlist_revision'] != watchlist_revision:
+        targets = load_watchlist_targets()
+        position_table['target_price'] = np.array(
+            [targets.get(symbol, np.nan) for symbol in position_table['symbols']], dtype=float
+        )
+        position_table['watchlist_revision'] = watchlist_revision
+        recompute_position_rows(position_table, np.arange(len(position_table['symbols'])))
+    
+    update_position_prices(position_table, prices)
+    return position_table
+
+def hash_row(row):
+    """Short content hash of a position or account dict"""
+    return hashlib.blake2b(json.dumps(row, sort_keys=True, default=str).encode('utf-8'), digest_size=8).hexdigest()
+
+def record_portfolio_snapshot(account_data, row_hashes, weights, since=None):
+    """Store the current snapshot and return it with the snapshot for `since`, if still held.
+
+    The version is a hash of the content, so identical portfolios share a version
+    even across server restarts.
+    """
+    account_hash = hash_row(account_data)
+    version = hashlib.blake2b(
+        (account_hash + hash_row(weights) + ''.join(f"{symbol}:{h}" for symbol, h in sorted(row_hashes.items()))).encode('utf-8'),
+        digest_size=8
+    ).hexdigest()
+    snapshot = {
+        'version': version, 'account': account_data, 'account_hash': account_hash,
+        'row_hashes': row_hashes, 'weights': weights
+    }
+    
+    with portfolio_snapshots_lock:
+        previous = portfolio_snapshots.get(since) if since else None
+        portfolio_snapshots[version] = snapshot
+        portfolio_snapshots.move_to_end(version)
+        while len(portfolio_snapshots) > MAX_PORTFOLIO_SNAPSHOTS:
+            portfolio_snapshots.popitem(last=False)
+    return snapshot, previous
+
+def build_portfolio_diff(previous, snapshot, account_data, positions):
+    """Added, changed and removed positions plus changed weights and account fields between snapshots"""
+    old_rows = previous['row_hashes']
+    new_rows = snapshot['row_hashes']
+    diff = {
+        'added': [p for p in positions if p['symbol'] not in old_rows],
+        'changed': [p for p in positions if p['symbol'] in old_rows and old_rows[p['symbol']] != new_rows[p['symbol']]],
+        'removed': [symbol for symbol in old_rows if symbol not in new_rows],
+        'weights': {
+            symbol: weight for symbol, weight in snapshot['weights'].items()
+            if previous['weights'].get(symbol) != weight
+        },
+        'account': {}
+    }
+    if previous['account_hash'] != snapshot['account_hash']:
+        diff['account'] = {
+            field: value for field, value in account_data.items()
+            if previous['account'].get(field) != value
+        }
+    return diff
+
+@app.route('/api/accounts', methods=['GET'])
+def list_accounts():
+    """List configured account profiles without their secrets"""
+    try:
+        return jsonify({
+            'success': True,
+            'accounts': [
+                {'name': p['name'], 'paper': p.get('paper')}
+                for p in get_account_profiles()
+            ]
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to list accounts: {str(e)}'}), 500
+
+@app.route('/api/accounts', methods=['POST'])
+def save_account():
+    """Add or replace a named account profile"""
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        fields = [data.get('name'), data.get('api_key'), data.get('secret_key')]
+        if not all(isinstance(value, str) and value.strip() for value in fields):
+            return jsonify({'error': 'Name, API key and secret key are required'}), 400
+        name, api_key, secret_key = (value.strip() for value in fields)
+        paper = data.get('paper')
+        
+        # A string like "false" must not silently pick the paper client for live keys
+        if paper is not None and not isinstance(paper, bool):
+            return jsonify({'error': 'paper must be true, false or null'}), 400
+        if name == 'default':
+            return jsonify({'error': 'The default account is configured in Settings'}), 400
+        # 'data' is the pool key prefix for Data API clients
+        if name == 'data':
+            return jsonify({'error': 'The account name "data" is reserved'}), 400
+        
+        profiles = [p for p in load_account_profiles() if p.get('name') != name]
+        profiles.append({
+            'name': name,
+            'api_key': api_key,
+            'secret_key': secret_key,
+            'paper': paper
+        })
+        drop_pooled_clients(name)
+        
+        if save_account_profiles(profiles):
+            return jsonify({'success': True, 'message': f'Account {name} saved'})
+        else:
+            return jsonify({'error': 'Failed to save account profiles'}), 500
+    except Exception as e:
+        return jsonify({'error': f'Failed to save account: {str(e)}'}), 500
+
+@app.route('/api/accounts/<name>', methods=['DELETE'])
+def delete_account(name):
+    """Remove a named account profile"""
+    try:
+        profiles = load_account_profiles()
+        remaining = [p for p in profiles if p.get('name') != name]
+        if len(remaining) == len(profiles):
+            return jsonify({'error': f'Account {name} not found'}), 404
+        drop_pooled_clients(name)
+        
+        if save_account_profiles(remaining):
+            return jsonify({'success': True, 'message': f'Account {name} removed'})
+        else:
+            return jsonify({'error': 'Failed to save account profiles'}), 500
+    except Exception as e:
+        return jsonify({'error': f'Failed to remove account: {str(e)}'}), 500
+
+def fetch_account_snapshot(profile):
+    """Fetch account and positions for one profile"""
+    client = get_pooled_client(profile)
+    if not client:
+        raise RuntimeError('Failed to connect to Alpaca')
+    return client.get_account(), client.get_all_positions()
+
+def merge_positions(positions_by_account):
+    """Merge positions by symbol across accounts with weighted average cost"""
+    merged = {}
+    for account_name, positions in positions_by_account:
+        for position in positions:
+            entry = merged.setdefault(position.symbol, {
+                'symbol': position.symbol,
+                'quantity': 0.0,
+                'market_value': 0.0,
+                'cost_basis': 0.0,
+                'todays_pl': 0.0,
+                'total_pl': 0.0,
+                'accounts': []
+            })
             try:
                 quantity = float(position.qty)
             except (ValueError, TypeError):
-                print(f"Warning: Could not parse quantity for {position.symbol}. Value was: {position.qty}")
                 quantity = 0.0
-            
-            formatted_positions.append({
-                'symbol': position.symbol,
-                'company': get_company_name(position.symbol),
-                'quantity': quantity,
-                'current_price': round(current_price, 2),
-                'market_value': round(float(position.market_value), 2),
-                'avg_entry_price': round(float(position.avg_entry_price), 2),
-                'cost_basis': round(float(position.cost_basis), 2),
-                'todays_pl': round(float(position.unrealized_intraday_pl), 2),
-                'todays_pl_pc': round(float(position.unrealized_intraday_plpc) * 100, 2),
-                'total_pl': round(float(position.unrealized_pl), 2),
-                'total_pl_pc': round(float(position.unrealized_plpc) * 100, 2),
-            })
+            entry['quantity'] += quantity
+            entry['market_value'] += float(position.market_value)
+            entry['cost_basis'] += float(position.cost_basis)
+            entry['todays_pl'] += float(position.unrealized_intraday_pl)
+            entry['total_pl'] += float(position.unrealized_pl)
+            entry['accounts'].append({'account': account_name, 'quantity': quantity})
+    
+    formatted_positions = []
+    for entry in merged.values():
+        quantity = entry['quantity']
+        # Value at the start of the day, used as the base for today's P/L %
+        start_value = entry['market_value'] - entry['todays_pl']
+        formatted_positions.append({
+            'symbol': entry['symbol'],
+            'company': get_company_name(entry['symbol']),
+            'quantity': quantity,
+            'current_price': round(entry['market_value'] / quantity, 2) if quantity else 0.0,
+            'market_value': round(entry['market_value'], 2),
+            'avg_entry_price': round(entry['cost_basis'] / quantity, 2) if quantity else 0.0,
+            'cost_basis': round(entry['cost_basis'], 2),
+            'todays_pl': round(entry['todays_pl'], 2),
+            'todays_pl_pc': round(entry['todays_pl'] / abs(start_value) * 100, 2) if start_value else 0.0,
+            'total_pl': round(entry['total_pl'], 2),
+            'total_pl_pc': round(entry['total_pl'] / abs(entry['cost_basis']) * 100, 2) if entry['cost_basis'] else 0.0,
+            'accounts': entry['accounts']
+        })
+    
+    formatted_positions.sort(key=lambda x: x['market_value'], reverse=True)
+    return formatted_positions
+
+@app.route('/api/portfolio/consolidated', methods=['GET'])
+def get_consolidated_portfolio():
+    """Fetch every account profile in parallel and merge their positions"""
+    try:
+        load_dotenv(override=True)
         
-        # Sort positions by value (highest first)
-        formatted_positions.sort(key=lambda x: x['market_value'], reverse=True)
+        profiles = get_account_profiles()
+        if not profiles:
+            return jsonify({'error': 'No Alpaca accounts configured'}), 400
         
-        response_data = {
-            'account': {
-                'total_value': round(total_value, 2),
-                'cash': round(cash, 2),
-                'positions_value': round(positions_value, 2),
-                'buying_power': round(float(account.buying_power), 2),
-                'day_trade_count': int(float(account.daytrade_count)) if account.daytrade_count else 0,
+        # One worker per account so latency follows the slowest account
+        snapshots = {}
+        errors = {}
+        with ThreadPoolExecutor(max_workers=len(profiles)) as executor:
+            futures = {executor.submit(fetch_account_snapshot, p): p['name'] for p in profiles}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    snapshots[name] = future.result()
+                except Exception as e:
+                    print(f"Consolidated portfolio error for {name}: {str(e)}")
+                    errors[name] = str(e)
+        
+        accounts = []
+        totals = {'total_value': 0.0, 'cash': 0.0, 'positions_value': 0.0, 'buying_power': 0.0}
+        for profile in profiles:
+            name = profile['name']
+            if name not in snapshots:
+                accounts.append({'name': name, 'error': errors.get(name)})
+                continue
+            account, positions = snapshots[name]
+            total_value = float(account.portfolio_value)
+            cash = float(account.cash)
+            summary = {
+                'total_value': total_value,
+                'cash': cash,
+                'positions_value': total_value - cash,
+                'buying_power': float(account.buying_power)
+            }
+            for field, value in summary.items():
+                totals[field] += value
+            accounts.append({
+                'name': name,
+                **{field: round(value, 2) for field, value in summary.items()},
+                'position_count': len(positions),
                 'status': account.status,
                 'currency': account.currency
-            },
-            'positions': formatted_positions,
+            })
+        
+        response_data = {
+            'accounts': accounts,
+            'combined': {field: round(value, 2) for field, value in totals.items()},
+            'positions': merge_positions(
+                (p['name'], snapshots[p['name']][1]) for p in profiles if p['name'] in snapshots
+            ),
             'last_updated': datetime.now().isoformat()
         }
         
-        # Create response with cache-busting headers
         response = jsonify(response_data)
         response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
         response.headers['Pragma'] = 'no-cache'
@@ -246,8 +889,501 @@ def get_portfolio():
         return response
         
     except Exception as e:
-        print(f"Portfolio error: {str(e)}")
-        return jsonify({'error': f'Failed to fetch portfolio data: {str(e)}'}), 500
+        print(f"Consolidated portfolio error: {str(e)}")
+        return jsonify({'error': f'Failed to fetch consolidated portfolio: {str(e)}'}), 500
+
+def to_float(value, default=0.0):
+    """Parse an Alpaca numeric string, falling back to a default"""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+def get_latest_prices(data_client, symbols):
+    """Latest daily close for each symbol, skipping symbols without data"""
+    from alpaca.data.requests import StockBarsRequest
+    from alpaca.data.timeframe import TimeFrame
+    
+    if not data_client or not symbols:
+        return {}
+    bars_request = StockBarsRequest(
+        symbol_or_symbols=list(symbols),
+        timeframe=TimeFrame.Day,
+        start=datetime.now() - timedelta(days=7)
+    )
+    bars = data_client.get_stock_bars(bars_request)
+    return {symbol: float(series[-1].close) for symbol, series in bars.data.items() if series}
+
+def get_historical_returns(data_client, symbols, lookback_days):
+    """Daily return matrix (days x symbols) aligned on trading dates; gaps count as 0%"""
+    import numpy as np
+    from alpaca.data.requests import StockBarsRequest
+    from alpaca.data.timeframe import TimeFrame
+    
+    bars_request = StockBarsRequest(
+        symbol_or_symbols=list(symbols),
+        timeframe=TimeFrame.Day,
+        start=datetime.now() - timedelta(days=int(lookback_days * 1.5) + 7)
+    )
+    bars = data_client.get_stock_bars(bars_request)
+    closes_by_symbol = {
+        symbol: {bar.timestamp.date(): float(bar.close) for bar in series}
+        for symbol, series in bars.data.items()
+    }
+    dates = sorted({d for closes in closes_by_symbol.values() for d in closes})[-(lookback_days + 1):]
+    closes = np.full((len(dates), len(symbols)), np.nan)
+    for j, symbol in enumerate(symbols):
+        symbol_closes = closes_by_symbol.get(symbol, {})
+        closes[:, j] = [symbol_closes.get(d, np.nan) for d in dates]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = closes[1:] / closes[:-1] - 1.0
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+def simulate_rebalance(quantities, prices, cost_basis, cash, weights):
+    """Trades, resulting holdings and realized P/L for moving to target weights"""
+    import numpy as np
+    
+    values = quantities * prices
+    total_value = cash + values.sum()
+    trade_values = weights * total_value - values
+    trade_quantities = np.divide(trade_values, prices, out=np.zeros_like(prices), where=prices != 0)
+    avg_cost = np.divide(cost_basis, quantities, out=np.zeros_like(prices), where=quantities != 0)
+    
+    # Quantity that closes existing exposure: sells of longs, buys of shorts
+    closing = np.where(
+        quantities > 0,
+        np.clip(-trade_quantities, 0, np.abs(quantities)),
+        np.where(quantities < 0, np.clip(trade_quantities, 0, np.abs(quantities)), 0.0)
+    )
+    realized_pl = closing * (prices - avg_cost) * np.sign(quantities)
+    new_values = values + trade_values
+    
+    return {
+        'trade_quantities': trade_quantities,
+        'trade_values': trade_values,
+        'new_quantities': quantities + trade_quantities,
+        'new_values': new_values,
+        'new_weights': new_values / total_value if total_value else np.zeros_like(values),
+        'realized_pl': realized_pl,
+        'new_cash': cash - trade_values.sum(),
+        'total_value': total_value,
+        # One-way turnover: half the gross traded value over portfolio value
+        'turnover': np.abs(trade_values).sum() / (2 * total_value) if total_value else 0.0
+    }
+
+def simulate_shocks(values, cash, shocks):
+    """Resulting value and P/L for each scenario row of fractional price shocks"""
+    new_values = values * (1.0 + shocks)
+    pl_impact = new_values.sum(axis=1) - values.sum()
+    return new_values, cash + new_values.sum(axis=1), pl_impact
+
+def summarize_scenarios(pl_impact, total_values, current_total):
+    """Distribution statistics over many simulated scenarios"""
+    import numpy as np
+    
+    percentiles = [1, 5, 25, 50, 75, 95, 99]
+    pl_percentiles = np.percentile(pl_impact, percentiles)
+    tail = np.sort(pl_impact)[:max(1, int(len(pl_impact) * 0.05))]
+    return {
+        'count': int(len(pl_impact)),
+        'mean_pl': round(float(pl_impact.mean()), 2),
+        'std_pl': round(float(pl_impact.std()), 2),
+        'probability_of_loss': round(float((pl_impact < 0).mean()), 4),
+        'pl_percentiles': {f'p{p}': round(float(v), 2) for p, v in zip(percentiles, pl_percentiles)},
+        'value_at_risk_95': round(float(-pl_percentiles[1]), 2),
+        'expected_shortfall_95': round(float(-tail.mean()), 2),
+        'worst_total_value': round(float(total_values.min()), 2),
+        'best_total_value': round(float(total_values.max()), 2),
+        'worst_return_pc': round(float(pl_impact.min() / current_total * 100), 2) if current_total else 0.0
+    }
+
+def is_number(value):
+    """True for finite JSON numbers (bools excluded)"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+def parse_number_map(value, name):
+    """Validate a {symbol: number} object from a request body"""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError(f'{name} must be an object mapping symbols to numbers')
+    parsed = {}
+    for symbol, number in value.items():
+        if not is_number(number):
+            raise ValueError(f'{name}.{symbol} must be a number')
+        parsed[symbol.upper()] = float(number)
+    return parsed
+
+def parse_scenarios(value):
+    """Validate scenario settings, filling in defaults and clamping sizes"""
+    if value is None:
+        return None
+    if not isinstance(value, dict):
+        raise ValueError('scenarios must be an object')
+    
+    def number(key, default, cast, low, high):
+        raw = value.get(key, default)
+        if not is_number(raw):
+            raise ValueError(f'scenarios.{key} must be a number')
+        return max(low, min(cast(raw), high))
+    
+    scenario_type = value.get('type', 'grid')
+    if scenario_type == 'grid':
+        symbols = value.get('symbols')
+        if symbols is not None and (not isinstance(symbols, list) or not all(isinstance(s, str) for s in symbols)):
+            raise ValueError('scenarios.symbols must be a list of ticker strings')
+        return {
+            'type': 'grid',
+            'steps': number('steps', 101, int, 2, 10001),
+            'min': number('min', -0.5, float, -1.0, float('inf')),
+            'max': number('max', 0.5, float, -1.0, float('inf')),
+            'symbols': [s.upper() for s in symbols] if symbols is not None else None
+        }
+    if scenario_type == 'monte_carlo':
+        seed = value.get('seed')
+        if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+            raise ValueError('scenarios.seed must be a non-negative integer')
+        return {
+            'type': 'monte_carlo',
+            'count': number('count', 10000, int, 1, 100000),
+            'horizon_days': number('horizon_days', 1, int, 1, 60),
+            'lookback_days': number('lookback_days', 252, int, 20, 1260),
+            'seed': seed
+        }
+    raise ValueError(f'Unknown scenario type: {scenario_type}')
+
+@app.route('/api/portfolio/simulate', methods=['POST'])
+def simulate_portfolio():
+    """What-if simulation: rebalance to target weights, apply price shocks or run many scenarios"""
+    try:
+        import numpy as np
+        
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        
+        # Validate all client input before touching Alpaca
+        try:
+            target_weights = parse_number_map(data.get('target_weights'), 'target_weights')
+            shocks = parse_number_map(data.get('shocks'), 'shocks')
+            scenarios = parse_scenarios(data.get('scenarios'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not any([target_weights, shocks, scenarios]):
+            return jsonify({'error': 'Provide target_weights, shocks or scenarios'}), 400
+        if any(shock < -1 for shock in shocks.values()):
+            return jsonify({'error': 'Shocks cannot be below -1 (a 100% drop)'}), 400
+        
+        trading_client = get_trading_client()
+        if not trading_client:
+            return jsonify({'error': 'Alpaca API not configured'}), 400
+        
+        account = trading_client.get_account()
+        positions = trading_client.get_all_positions()
+        cash = float(account.cash)
+        
+        symbols = [p.symbol for p in positions]
+        quantities = np.array([to_float(p.qty) for p in positions], dtype=float)
+        prices = np.array([to_float(p.current_price) for p in positions], dtype=float)
+        cost_basis = np.array([to_float(p.cost_basis) for p in positions], dtype=float)
+        
+        # Target symbols not currently held become zero-quantity rows priced from market data
+        new_symbols = [s for s in target_weights if s not in symbols]
+        if new_symbols:
+            latest = get_latest_prices(get_data_client(), new_symbols)
+            missing = [s for s in new_symbols if s not in latest]
+            if missing:
+                return jsonify({'error': f'No price data for: {", ".join(missing)}'}), 400
+            symbols.extend(new_symbols)
+            quantities = np.concatenate([quantities, np.zeros(len(new_symbols))])
+            prices = np.concatenate([prices, [latest[s] for s in new_symbols]])
+            cost_basis = np.concatenate([cost_basis, np.zeros(len(new_symbols))])
+        
+        values = quantities * prices
+        total_value = cash + values.sum()
+        result = {
+            'current': {
+                'total_value': round(float(total_value), 2),
+                'cash': round(cash, 2),
+                'positions': [
+                    {
+                        'symbol': symbol,
+                        'quantity': float(q),
+                        'price': round(float(px), 2),
+                        'market_value': round(float(v), 2),
+                        'weight': round(float(v / total_value), 6) if total_value else 0.0
+                    }
+                    for symbol, q, px, v in zip(symbols, quantities, prices, values)
+                ]
+            }
+        }
+        
+        if target_weights:
+            weights = np.array([target_weights.get(s, 0.0) for s in symbols], dtype=float)
+            if weights.sum() > 1.0 + 1e-9:
+                return jsonify({'error': 'Target weights must sum to at most 1 (the rest stays in cash)'}), 400
+            rebalance = simulate_rebalance(quantities, prices, cost_basis, cash, weights)
+            result['rebalance'] = {
+                'trades': [
+                    {
+                        'symbol': symbol,
+                        'side': 'buy' if tq > 0 else 'sell',
+                        'quantity': round(float(abs(tq)), 6),
+                        'value': round(float(abs(tv)), 2),
+                        'new_quantity': round(float(nq), 6),
+                        'new_weight': round(float(nw), 6),
+                        'realized_pl': round(float(rpl), 2)
+                    }
+                    for symbol, tq, tv, nq, nw, rpl in zip(
+                        symbols, rebalance['trade_quantities'], rebalance['trade_values'],
+                        rebalance['new_quantities'], rebalance['new_weights'], rebalance['realized_pl']
+                    )
+                    if abs(tv) >= 0.005
+                ],
+                'cash': round(float(rebalance['new_cash']), 2),
+                'cash_weight': round(float(rebalance['new_cash'] / total_value), 6) if total_value else 0.0,
+                'realized_pl': round(float(rebalance['realized_pl'].sum()), 2),
+                'turnover_pc': round(float(rebalance['turnover']) * 100, 2)
+            }
+        
+        if shocks:
+            # '*' applies a shock to every position without an explicit one
+            default_shock = shocks.get('*', 0.0)
+            shock_row = np.array([[shocks.get(s, default_shock) for s in symbols]], dtype=float)
+            new_values, new_totals, pl_impact = simulate_shocks(values, cash, shock_row)
+            new_total = float(new_totals[0])
+            result['shock'] = {
+                'total_value': round(new_total, 2),
+                'pl_impact': round(float(pl_impact[0]), 2),
+                'return_pc': round(float(pl_impact[0] / total_value * 100), 2) if total_value else 0.0,
+                'cash_weight': round(cash / new_total, 6) if new_total else 0.0,
+                'positions': [
+                    {
+                        'symbol': symbol,
+                        'shock_pc': round(float(sh) * 100, 2),
+                        'new_price': round(float(px * (1 + sh)), 2),
+                        'market_value': round(float(nv), 2),
+                        'pl_impact': round(float(nv - v), 2),
+                        'total_pl': round(float(nv - cb), 2),
+                        'weight': round(float(nv / new_total), 6) if new_total else 0.0
+                    }
+                    for symbol, sh, px, v, nv, cb in zip(symbols, shock_row[0], prices, values, new_values[0], cost_basis)
+                ]
+            }
+        
+        if scenarios:
+            scenario_type = scenarios['type']
+            if scenario_type == 'grid':
+                levels = np.linspace(scenarios['min'], scenarios['max'], scenarios['steps'])
+                shocked = set(scenarios['symbols'] if scenarios['symbols'] is not None else symbols)
+                mask = np.array([s in shocked for s in symbols], dtype=float)
+                shock_matrix = levels[:, None] * mask[None, :]
+            else:
+                count = scenarios['count']
+                horizon = scenarios['horizon_days']
+                lookback = scenarios['lookback_days']
+                data_client = get_data_client()
+                if not data_client or not symbols:
+                    return jsonify({'error': 'Market data is required for Monte Carlo scenarios'}), 400
+                returns = get_historical_returns(data_client, symbols, lookback)
+                if len(returns) == 0:
+                    return jsonify({'error': 'No historical data available'}), 400
+                # Bootstrap whole trading days so cross-asset correlation is preserved
+                rng = np.random.default_rng(scenarios['seed'])
+                growth = np.ones((count, len(symbols)))
+                for _ in range(horizon):
+                    growth *= 1.0 + returns[rng.integers(0, len(returns), size=count)]
+                shock_matrix = growth - 1.0
+            
+            _, new_totals, pl_impact = simulate_shocks(values, cash, shock_matrix)
+            result['scenarios'] = {
+                'type': scenario_type,
+                'summary': summarize_scenarios(pl_impact, new_totals, total_value)
+            }
+            if scenario_type == 'grid':
+                result['scenarios']['grid'] = [
+                    {'shock_pc': round(float(level) * 100, 4), 'total_value': round(float(t), 2), 'pl_impact': round(float(pl), 2)}
+                    for level, t, pl in zip(levels, new_totals, pl_impact)
+                ]
+        
+        return jsonify({'success': True, **result})
+        
+    except Exception as e:
+        print(f"Simulation error: {str(e)}")
+        return jsonify({'error': f'Failed to run simulation: {str(e)}'}), 500
+
+def get_research_db():
+    """Open the research database, creating its schema on first use"""
+    global research_db_ready
+    conn = sqlite3.connect(RESEARCH_DB, timeout=10)
+    conn.row_factory = sqlite3.Row
+    if not research_db_ready:
+        with conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS citations (
+                    id TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    title TEXT,
+                    date TEXT,
+                    snippet TEXT,
+                    first_seen TEXT NOT NULL,
+                    last_seen TEXT NOT NULL,
+                    times_seen INTEGER NOT NULL DEFAULT 1
+                );
+                CREATE TABLE IF NOT EXISTS citation_links (
+                    citation_id TEXT NOT NULL REFERENCES citations(id),
+                    symbol TEXT NOT NULL DEFAULT '',
+                    conversation_id TEXT NOT NULL DEFAULT '',
+                    seen_at TEXT NOT NULL,
+                    PRIMARY KEY (citation_id, symbol, conversation_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_links_symbol_seen ON citation_links (symbol, seen_at DESC);
+                CREATE INDEX IF NOT EXISTS idx_links_conversation ON citation_links (conversation_id);
+            """)
+        research_db_ready = True
+    return conn
+
+def normalize_url(url):
+    """Canonical form of a URL for deduplication (no fragment, tracking params or trailing slash)"""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith('utm_') and k.lower() not in ('fbclid', 'gclid')
+    ))
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https' if parts.scheme in ('http', 'https') else parts.scheme, host, path, query, ''))
+
+def citation_id_for(url):
+    """Stable short id from the normalized URL hash"""
+    return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()[:16]
+
+def extract_symbols(text):
+    """Tickers called out as **TICKER**, $TICKER or (EXCHANGE: TICKER) in a response.
+
+    Only symbols confirmed by a loaded asset cache are returned, so bolded words
+    like **NOTE** are never linked; without the cache nothing is extracted.
+    """
+    if not (asset_cache_built and asset_name_cache):
+        return []
+    found = re.findall(r'\*\*\[?([A-Z]{1,5}(?:\.[A-Z])?)\]?\b|\$([A-Z]{1,5})\b|\((?:NASDAQ|NYSE|AMEX|NYSEARCA)\s*:\s*([A-Z]{1,5})\)', text or '')
+    symbols = dict.fromkeys(s for groups in found for s in groups if s)
+    return [s for s in symbols if s in asset_name_cache]
+
+def record_citations(search_results, symbols=(), conversation_id=''):
+    """Store search results, link them to symbols and a conversation.
+
+    Returns the citation ids in result order and the details of citations this
+    conversation has not seen before.
+    """
+    now = datetime.now().isoformat()
+    ids = []
+    seen = set()
+    details = {}
+    with closing(get_research_db()) as conn, conn:
+        for result in search_results or []:
+            url = (result or {}).get('url')
+            if not url:
+                continue
+            # Results that normalize to the same URL are one source
+            cid = citation_id_for(url)
+            if cid in seen:
+                continue
+            seen.add(cid)
+            ids.append(cid)
+            conn.execute("""
+                INSERT INTO citations (id, url, title, date, snippet, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    title = COALESCE(excluded.title, title),
+                    date = COALESCE(excluded.date, date),
+                    snippet = COALESCE(excluded.snippet, snippet),
+                    last_seen = excluded.last_seen,
+                    times_seen = times_seen + 1
+            """, (cid, url, result.get('title'), result.get('date'), result.get('snippet'), now, now))
+            
+            seen_before = conversation_id and conn.execute(
+                "SELECT 1 FROM citation_links WHERE citation_id = ? AND conversation_id = ? LIMIT 1",
+                (cid, conversation_id)
+            ).fetchone()
+            if not seen_before:
+                details[cid] = {'url': url, 'title': result.get('title'), 'date': result.get('date')}
+            
+            conn.executemany("""
+                INSERT INTO citation_links (citation_id, symbol, conversation_id, seen_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(citation_id, symbol, conversation_id) DO UPDATE SET seen_at = excluded.seen_at
+            """, [(cid, symbol, conversation_id or '', now) for symbol in (list(symbols) or [''])])
+    return ids, details
+
+def citation_row_to_dict(row):
+    """Public view of a stored citation"""
+    return {
+        'id': row['id'],
+        'url': row['url'],
+        'title': row['title'],
+        'date': row['date'],
+        'snippet': row['snippet'],
+        'first_seen': row['first_seen'],
+        'last_seen': row['last_seen'],
+        'times_seen': row['times_seen']
+    }
+
+@app.route('/api/citations', methods=['GET'])
+def get_citations():
+    """Resolve compact citation ids from chat responses to full citations"""
+    try:
+        ids = [i for i in request.args.get('ids', '').split(',') if i][:100]
+        if not ids:
+            return jsonify({'error': 'ids are required'}), 400
+        
+        with closing(get_research_db()) as conn:
+            rows = conn.execute(
+                f"SELECT * FROM citations WHERE id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall()
+        return jsonify({
+            'success': True,
+            'citations': {row['id']: citation_row_to_dict(row) for row in rows}
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to get citations: {str(e)}'}), 500
+
+@app.route('/api/research/<symbol>', methods=['GET'])
+def get_symbol_research(symbol):
+    """Browse stored citations for a ticker, most recently seen first"""
+    try:
+        symbol = symbol.upper()
+        try:
+            limit = max(1, min(int(request.args.get('limit', 25)), 200))
+        except ValueError:
+            limit = 25
+        before = request.args.get('before')
+        
+        # Page on each citation's latest link so a source linked more than once never repeats
+        query = """
+            SELECT c.*, MAX(l.seen_at) AS linked_at
+            FROM citation_links l JOIN citations c ON c.id = l.citation_id
+            WHERE l.symbol = ?
+            GROUP BY c.id{before}
+            ORDER BY linked_at DESC
+            LIMIT ?
+        """.format(before=' HAVING MAX(l.seen_at) < ?' if before else '')
+        params = [symbol] + ([before] if before else []) + [limit]
+        
+        with closing(get_research_db()) as conn:
+            rows = conn.execute(query, params).fetchall()
+        return jsonify({
+            'success': True,
+            'symbol': symbol,
+            'citations': [{**citation_row_to_dict(row), 'linked_at': row['linked_at']} for row in rows]
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to get research for {symbol}: {str(e)}'}), 500
 
 def get_allowed_models():
     """Returns a list of allowed Perplexity models."""
@@ -259,46 +1395,33 @@ def get_allowed_models():
         'sonar'
     ]
 
-@app.route('/api/chat', methods=['POST'])
-def chat_with_ai():
-    """Handle chat messages and get AI responses from Perplexity"""
-    try:
-        data = request.get_json()
-        user_prompt = data.get('prompt')
-        chat_history = data.get('chat_history', [])
-        model_to_use = data.get('model', 'sonar-deep-research')
-        
-        if not user_prompt:
-            return jsonify({'error': 'Message is required'}), 400
-        
-        # Validate the model against the allowed list
-        if model_to_use not in get_allowed_models():
-            model_to_use = 'sonar-deep-research'  # Default to the most capable model if invalid
-        
-        perplexity_key = os.getenv('PERPLEXITY_API_KEY')
-        if not perplexity_key:
-            return jsonify({'error': 'Perplexity API key not configured'}), 400
-        
-        # Get portfolio context
-        portfolio_context = ""
-        try:
-            trading_client = get_trading_client()
-            if trading_client:
-                account = trading_client.get_account()
-                positions = trading_client.get_all_positions()
-                
-                portfolio_context = f"""
-                Portfolio Context:
-                - Total Value: ${float(account.portfolio_value):,.2f}
-                - Cash: ${float(account.cash):,.2f}
-                - Number of Positions: {len(positions)}
-                - Current Holdings: {', '.join([p.symbol for p in positions]) if positions else 'None'}
-                """
-        except:
-            portfolio_context = "Portfolio data unavailable."
-        
-        # Create the comprehensive system prompt
-        system_prompt = """
+def post_perplexity(perplexity_key, model, messages):
+    """Send a chat completion request to Perplexity, returning the response and payload"""
+    import requests
+    
+    headers = {
+        'Authorization': f'Bearer {perplexity_key}',
+        'Content-Type': 'application/json'
+    }
+    
+    payload = {
+        'model': model,
+        'messages': messages,
+        'max_tokens': 2000,
+        'temperature': 0.7,
+        'stream': False
+    }
+    
+    response = requests.post(
+        'https://api.perplexity.ai/chat/completions',
+        headers=headers,
+        json=payload,
+        timeout=60
+    )
+    return response, payload
+
+# Comprehensive system prompt shared by chat and batch analysis requests
+CHAT_SYSTEM_PROMPT = """
         You are an expert-level Financial Research Assistant integrated into a portfolio management application called "Portfolio InsightAI". Your primary role is to provide users with clear, data-driven, and well-structured insights about their stock portfolio and the broader market.
 
         **Core Instructions:**
@@ -368,6 +1491,45 @@ def chat_with_ai():
 
         **Output:** For each stock, present a full analysis using the **Standard Output Format for Single Stock Analysis**. If a target price isn't the primary focus, you can adapt that line accordingly.
         """
+
+@app.route('/api/chat', methods=['POST'])
+def chat_with_ai():
+    """Handle chat messages and get AI responses from Perplexity"""
+    try:
+        data = request.get_json()
+        user_prompt = data.get('prompt')
+        chat_history = data.get('chat_history', [])
+        model_to_use = data.get('model', 'sonar-deep-research')
+        conversation_id = data.get('conversation_id') or uuid.uuid4().hex
+        
+        if not user_prompt:
+            return jsonify({'error': 'Message is required'}), 400
+        
+        # Validate the model against the allowed list
+        if model_to_use not in get_allowed_models():
+            model_to_use = 'sonar-deep-research'  # Default to the most capable model if invalid
+        
+        perplexity_key = os.getenv('PERPLEXITY_API_KEY')
+        if not perplexity_key:
+            return jsonify({'error': 'Perplexity API key not configured'}), 400
+        
+        # Get portfolio context
+        portfolio_context = ""
+        try:
+            trading_client = get_trading_client()
+            if trading_client:
+                account = trading_client.get_account()
+                positions = trading_client.get_all_positions()
+                
+                portfolio_context = f"""
+                Portfolio Context:
+                - Total Value: ${float(account.portfolio_value):,.2f}
+                - Cash: ${float(account.cash):,.2f}
+                - Number of Positions: {len(positions)}
+                - Current Holdings: {', '.join([p.symbol for p in positions]) if positions else 'None'}
+                """
+        except:
+            portfolio_context = "Portfolio data unavailable."
         
         # Construct the full user message with portfolio context
         full_user_message = f"""
@@ -380,7 +1542,7 @@ def chat_with_ai():
         messages = [
             {
                 'role': 'system',
-                'content': system_prompt
+                'content': CHAT_SYSTEM_PROMPT
             }
         ]
         
@@ -395,35 +1557,35 @@ def chat_with_ai():
         })
         
         # Call Perplexity API with proper structure
-        headers = {
-            'Authorization': f'Bearer {perplexity_key}',
-            'Content-Type': 'application/json'
-        }
-        
-        payload = {
-            'model': model_to_use,
-            'messages': messages,
-            'max_tokens': 2000,
-            'temperature': 0.7,
-            'stream': False
-        }
-        
-        response = requests.post(
-            'https://api.perplexity.ai/chat/completions',
-            headers=headers,
-            json=payload,
-            timeout=60
-        )
+        response, payload = post_perplexity(perplexity_key, model_to_use, messages)
         
         if response.status_code == 200:
             result = response.json()
             ai_response = result['choices'][0]['message']['content']
             search_results = result.get('search_results', [])
             
+            # Store sources once and send ids, plus details only for sources new to this conversation
+            try:
+                symbols = list(dict.fromkeys(
+                    [s.upper() for s in (data.get('symbols') or []) if isinstance(s, str)] + extract_symbols(ai_response)
+                ))
+                citation_ids, citation_details = record_citations(search_results, symbols, conversation_id)
+            except Exception as e:
+                print(f"Error storing citations: {e}")
+                return jsonify({
+                    'success': True,
+                    'response': ai_response,
+                    'search_results': search_results,
+                    'conversation_id': conversation_id,
+                    'portfolio_context': portfolio_context.strip()
+                })
+            
             return jsonify({
                 'success': True,
                 'response': ai_response,
-                'search_results': search_results,
+                'citations': citation_ids,
+                'citation_details': citation_details,
+                'conversation_id': conversation_id,
                 'portfolio_context': portfolio_context.strip()
             })
         else:
@@ -483,9 +1645,12 @@ def get_status():
 def clear_cache():
     """Clear the company name cache"""
     try:
-        global asset_name_cache
+        global asset_name_cache, asset_cache_built, symbol_index
         cache_size = len(asset_name_cache)
-        asset_name_cache.clear()
+        # Swap in fresh objects so the next lookup rebuilds cache and index together
+        asset_name_cache = {}
+        symbol_index = None
+        asset_cache_built = False
         return jsonify({
             'success': True,
             'message': f'Cache cleared. Removed {cache_size} cached company names.'
@@ -493,6 +1658,30 @@ def clear_cache():
     except Exception as e:
         return jsonify({'error': f'Failed to clear cache: {str(e)}'}), 500
 
+@app.route('/api/search', methods=['GET'])
+def search_assets():
+    """Search the asset universe by partial ticker or company name"""
+    try:
+        query = request.args.get('q', '').strip()
+        try:
+            limit = max(1, min(int(request.args.get('limit', 10)), 50))
+        except ValueError:
+            limit = 10
+        
+        if not query:
+            return jsonify({'error': 'Query is required'}), 400
+        
+        if not asset_cache_built:
+            build_asset_cache()
+        
+        return jsonify({
+            'success': True,
+            'query': query,
+            'results': search_symbols(query, limit)
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to search assets: {str(e)}'}), 500
+
 @app.route('/api/watchlist', methods=['GET'])
 def get_watchlist():
     """Get watchlist with real-time market data"""
@@ -525,35 +1714,38 @@ def add_to_watchlist():
         if not company_name:
             company_name = get_company_name(symbol)
         
-        watchlist = load_watchlist()
-        
-        # Check if already in watchlist
-        existing_item = next((item for item in watchlist if item.get('symbol', '').upper() == symbol), None)
-        if existing_item:
-            return jsonify({'error': f'{symbol} is already in your watchlist'}), 400
-        
-        # Add new item
-        new_item = {
-            'symbol': symbol,
-            'company_name': company_name,
-            'entry_price': entry_price,
-            'stop_price': stop_price,
-            'target_price': target_price,
-            'notes': notes,
-            'ai_analysis': ai_analysis,  # Store the AI analysis
-            'added_date': datetime.now().isoformat()
-        }
-        
-        watchlist.append(new_item)
-        
-        if save_watchlist(watchlist):
-            return jsonify({
-                'success': True,
-                'message': f'{symbol} added to watchlist',
-                'item': new_item
-            })
-        else:
-            return jsonify({'error': 'Failed to save watchlist'}), 500
+        with watchlist_lock:
+            watchlist = load_watchlist()
+            
+            # Check if already in watchlist
+            existing_item = next((item for item in watchlist if item.get('symbol', '').upper() == symbol), None)
+            if existing_item:
+                return jsonify({'error': f'{symbol} is already in your watchlist'}), 400
+            
+            # Add new item
+            new_item = {
+                'symbol': symbol,
+                'company_name': company_name,
+                'entry_price': entry_price,
+                'stop_price': stop_price,
+                'target_price': target_price,
+                'notes': notes,
+                'ai_analysis': ai_analysis,  # Store the AI analysis
+                'added_date': datetime.now().isoformat()
+            }
+            if ai_analysis:
+                new_item['analysis_date'] = new_item['added_date']
+            
+            watchlist.append(new_item)
+            
+            if save_watchlist(watchlist):
+                return jsonify({
+                    'success': True,
+                    'message': f'{symbol} added to watchlist',
+                    'item': new_item
+                })
+            else:
+                return jsonify({'error': 'Failed to save watchlist'}), 500
             
     except Exception as e:
         return jsonify({'error': f'Failed to add to watchlist: {str(e)}'}), 500
@@ -563,22 +1755,23 @@ def remove_from_watchlist(symbol):
     """Remove a stock from the watchlist"""
     try:
         symbol = symbol.upper()
-        watchlist = load_watchlist()
-        
-        # Find and remove the item
-        original_length = len(watchlist)
-        watchlist = [item for item in watchlist if item.get('symbol', '').upper() != symbol]
-        
-        if len(watchlist) == original_length:
-            return jsonify({'error': f'{symbol} not found in watchlist'}), 404
-        
-        if save_watchlist(watchlist):
-            return jsonify({
-                'success': True,
-                'message': f'{symbol} removed from watchlist'
-            })
-        else:
-            return jsonify({'error': 'Failed to save watchlist'}), 500
+        with watchlist_lock:
+            watchlist = load_watchlist()
+            
+            # Find and remove the item
+            original_length = len(watchlist)
+            watchlist = [item for item in watchlist if item.get('symbol', '').upper() != symbol]
+            
+            if len(watchlist) == original_length:
+                return jsonify({'error': f'{symbol} not found in watchlist'}), 404
+            
+            if save_watchlist(watchlist):
+                return jsonify({
+                    'success': True,
+                    'message': f'{symbol} removed from watchlist'
+                })
+            else:
+                return jsonify({'error': 'Failed to save watchlist'}), 500
             
     except Exception as e:
         return jsonify({'error': f'Failed to remove from watchlist: {str(e)}'}), 500
@@ -590,35 +1783,216 @@ def update_watchlist_item(symbol):
         symbol = symbol.upper()
         data = request.get_json()
         
-        watchlist = load_watchlist()
+        with watchlist_lock:
+            watchlist = load_watchlist()
+            
+            # Find the item to update
+            item_index = next((i for i, item in enumerate(watchlist) if item.get('symbol', '').upper() == symbol), None)
+            
+            if item_index is None:
+                return jsonify({'error': f'{symbol} not found in watchlist'}), 404
+            
+            # Update the item
+            watchlist[item_index].update({
+                'entry_price': data.get('entry_price'),
+                'stop_price': data.get('stop_price'),
+                'target_price': data.get('target_price'),
+                'notes': data.get('notes', watchlist[item_index].get('notes', '')),
+                'ai_analysis': data.get('ai_analysis', watchlist[item_index].get('ai_analysis', '')),  # Handle AI analysis updates
+                'updated_date': datetime.now().isoformat()
+            })
+            if data.get('ai_analysis'):
+                watchlist[item_index]['analysis_date'] = watchlist[item_index]['updated_date']
+            
+            if save_watchlist(watchlist):
+                return jsonify({
+                    'success': True,
+                    'message': f'{symbol} updated in watchlist',
+                    'item': watchlist[item_index]
+                })
+            else:
+                return jsonify({'error': 'Failed to save watchlist'}), 500
+            
+    except Exception as e:
+        return jsonify({'error': f'Failed to update watchlist item: {str(e)}'}), 500
+
+@app.route('/api/analysis/batch', methods=['POST'])
+def batch_analysis():
+    """Run AI analysis for many symbols and stream progress as NDJSON"""
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        scope = data.get('scope')
+        model_to_use = data.get('model', 'sonar-pro')
+        force = bool(data.get('force', False))
         
-        # Find the item to update
-        item_index = next((i for i, item in enumerate(watchlist) if item.get('symbol', '').upper() == symbol), None)
+        if scope not in (None, 'watchlist', 'holdings'):
+            return jsonify({'error': 'scope must be "watchlist" or "holdings"'}), 400
         
-        if item_index is None:
-            return jsonify({'error': f'{symbol} not found in watchlist'}), 404
+        if model_to_use not in get_allowed_models():
+            model_to_use = 'sonar-pro'
         
-        # Update the item
-        watchlist[item_index].update({
-            'entry_price': data.get('entry_price'),
-            'stop_price': data.get('stop_price'),
-            'target_price': data.get('target_price'),
-            'notes': data.get('notes', watchlist[item_index].get('notes', '')),
-            'ai_analysis': data.get('ai_analysis', watchlist[item_index].get('ai_analysis', '')),  # Handle AI analysis updates
-            'updated_date': datetime.now().isoformat()
-        })
+        perplexity_key = os.getenv('PERPLEXITY_API_KEY')
+        if not perplexity_key:
+            return jsonify({'error': 'Perplexity API key not configured'}), 400
         
-        if save_watchlist(watchlist):
-            return jsonify({
-                'success': True,
-                'message': f'{symbol} updated in watchlist',
-                'item': watchlist[item_index]
-            })
+        # Resolve the requested symbols
+        if scope == 'watchlist':
+            requested = [item.get('symbol', '') for item in load_watchlist()]
+        elif scope == 'holdings':
+            trading_client = get_trading_client()
+            if not trading_client:
+                return jsonify({'error': 'Alpaca API not configured'}), 400
+            requested = [p.symbol for p in trading_client.get_all_positions()]
         else:
-            return jsonify({'error': 'Failed to save watchlist'}), 500
+            requested = data.get('symbols') or []
+            if not isinstance(requested, list) or not all(isinstance(s, str) for s in requested):
+                return jsonify({'error': 'symbols must be a list of ticker strings'}), 400
+        
+        symbols = list(dict.fromkeys(s.strip().upper() for s in requested if s and s.strip()))
+        if not symbols:
+            return jsonify({'error': 'No symbols to analyze'}), 400
+        
+        # Skip symbols with a recent analysis or one already running in another batch
+        recent = get_recent_analyses()
+        cutoff = datetime.now() - AI_ANALYSIS_MAX_AGE
+        skipped = []
+        pending = []
+        with analysis_lock:
+            for symbol in symbols:
+                if symbol in analysis_in_flight:
+                    skipped.append({'symbol': symbol, 'reason': 'in_progress'})
+                elif not force and symbol in recent and recent[symbol]['analysis_date'] >= cutoff:
+                    # Return the cached text so analyses of symbols outside the watchlist stay reachable
+                    skipped.append({
+                        'symbol': symbol,
+                        'reason': 'recent',
+                        'analysis_date': recent[symbol]['analysis_date'].isoformat(),
+                        'ai_analysis': recent[symbol]['ai_analysis']
+                    })
+                else:
+                    pending.append(symbol)
+            analysis_in_flight.update(pending)
+        
+        # Company names are needed by every prompt; fetch the asset list once up front
+        if pending and not asset_cache_built:
+            build_asset_cache()
+        
+        # Work starts now and results are saved as they finish, whether or not the stream is read
+        executor = ThreadPoolExecutor(max_workers=max(1, BATCH_ANALYSIS_WORKERS))
+        futures = {
+            executor.submit(analyze_and_store, symbol, model_to_use, perplexity_key): symbol
+            for symbol in pending
+        }
+        
+        def generate():
+            completed = 0
+            failed = 0
+            yield json.dumps({
+                'type': 'start',
+                'total': len(symbols),
+                'queued': pending,
+                'skipped': skipped,
+                'model': model_to_use
+            }) + '\n'
+            
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    analysis = future.result()
+                    completed += 1
+                    event = {'type': 'result', 'symbol': symbol, 'status': 'completed', 'ai_analysis': analysis}
+                except Exception as e:
+                    failed += 1
+                    event = {'type': 'result', 'symbol': symbol, 'status': 'error', 'error': str(e)}
+                event['progress'] = {'done': completed + failed, 'queued': len(pending)}
+                yield json.dumps(event) + '\n'
             
+            yield json.dumps({
+                'type': 'done',
+                'completed': completed,
+                'failed': failed,
+                'skipped': len(skipped)
+            }) + '\n'
+        
+        def release_pending():
+            # Client disconnected or batch finished: drop anything not yet started.
+            # Running analyses still finish, store themselves and clear their own flag.
+            executor.shutdown(wait=False, cancel_futures=True)
+            with analysis_lock:
+                analysis_in_flight.difference_update(
+                    symbol for future, symbol in futures.items() if future.cancelled()
+                )
+        
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        response.call_on_close(release_pending)
+        return response
+        
     except Exception as e:
-        return jsonify({'error': f'Failed to update watchlist item: {str(e)}'}), 500
+        return jsonify({'error': f'Failed to start batch analysis: {str(e)}'}), 500
+
+def analyze_symbol(symbol, model, perplexity_key):
+    """Request a single-stock analysis from Perplexity"""
+    messages = [
+        {'role': 'system', 'content': CHAT_SYSTEM_PROMPT},
+        {'role': 'user', 'content': f"Analyze {symbol} ({get_company_name(symbol)})"}
+    ]
+    response, _ = post_perplexity(perplexity_key, model, messages)
+    if response.status_code != 200:
+        raise RuntimeError(f'Perplexity API error: {response.status_code}')
+    result = response.json()
+    try:
+        record_citations(result.get('search_results', []), [symbol])
+    except Exception as e:
+        print(f"Error storing citations for {symbol}: {e}")
+    return result['choices'][0]['message']['content']
+
+def analyze_and_store(symbol, model, perplexity_key):
+    """Analyze a symbol and save the result, then clear its in-flight flag"""
+    try:
+        analysis = analyze_symbol(symbol, model, perplexity_key)
+        store_analysis(symbol, analysis)
+        return analysis
+    finally:
+        with analysis_lock:
+            analysis_in_flight.discard(symbol)
+
+def get_recent_analyses():
+    """Map symbol -> {'ai_analysis', 'analysis_date'} for the latest known analysis"""
+    recent = {}
+    for item in load_watchlist():
+        analysis_date = item.get('analysis_date')
+        if item.get('ai_analysis') and analysis_date:
+            try:
+                recent[item.get('symbol', '').upper()] = {
+                    'ai_analysis': item['ai_analysis'],
+                    'analysis_date': datetime.fromisoformat(analysis_date)
+                }
+            except ValueError:
+                continue
+    with analysis_lock:
+        for symbol, cached in analysis_cache.items():
+            cached_date = datetime.fromisoformat(cached['analysis_date'])
+            if symbol not in recent or cached_date > recent[symbol]['analysis_date']:
+                recent[symbol] = {'ai_analysis': cached['ai_analysis'], 'analysis_date': cached_date}
+    return recent
+
+def store_analysis(symbol, analysis):
+    """Record a fresh analysis and write it into the matching watchlist item"""
+    analysis_date = datetime.now().isoformat()
+    with analysis_lock:
+        analysis_cache[symbol] = {'ai_analysis': analysis, 'analysis_date': analysis_date}
+    
+    with watchlist_lock:
+        watchlist = load_watchlist()
+        for item in watchlist:
+            if item.get('symbol', '').upper() == symbol:
+                item['ai_analysis'] = analysis
+                item['analysis_date'] = analysis_date
+                item['updated_date'] = analysis_date
+                save_watchlist(watchlist)
+                break
 
 def load_watchlist():
     """Load watchlist from JSON file"""
@@ -633,9 +2007,11 @@ def load_watchlist():
 
 def save_watchlist(watchlist):
     """Save watchlist to JSON file"""
+    global watchlist_revision
     try:
         with open(WATCHLIST_FILE, 'w') as f:
             json.dump(watchlist, f, indent=2)
+        watchlist_revision += 1
         return True
     except Exception as e:
         print(f"Error saving watchlist: {e}")
@@ -643,6 +2019,9 @@ def save_watchlist(watchlist):
 
 def get_watchlist_with_market_data():
     """Get watchlist items with real-time market data"""
+    from alpaca.data.requests import StockBarsRequest
+    from alpaca.data.timeframe import TimeFrame
+    
     watchlist = load_watchlist()
     data_client = get_data_client()
     
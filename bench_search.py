@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Symbol search benchmark for Portfolio Insight AI
+
+Builds the search index over a synthetic asset list the size of Alpaca's
+(about 12,000 names) and times typeahead queries, including common words
+and multi-word queries, so search regressions are easy to spot.
+
+Usage:
+    python bench_search.py [--assets N] [--runs N]
+"""
+
+import time
+import random
+import string
+import argparse
+import statistics
+
+import app
+
+QUERIES = ['a', 'ap', 'aapl', 'apple', 'inc', 'corp', 'brk b', 'alphabet class a', 'a inc', 'inc a', 'inc corp']
+
+def synthetic_names(count):
+    """Real-looking tickers and names plus random filler up to count assets"""
+    names = {
+        'AAPL': 'Apple Inc.', 'MSFT': 'Microsoft Corporation', 'BRK.B': 'Berkshire Hathaway Inc. Class B',
+        'GOOG': 'Alphabet Inc. Class C Capital Stock', 'GOOGL': 'Alphabet Inc. Class A Common Stock'
+    }
+    rng = random.Random(0)
+    while len(names) < count:
+        symbol = ''.join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 5)))
+        words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))).title()
+                 for _ in range(rng.randint(1, 3))]
+        names.setdefault(symbol, ' '.join(words + [rng.choice(['Inc.', 'Corp', 'Holdings', 'ETF'])]))
+    return names
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure symbol search latency')
+    parser.add_argument('--assets', type=int, default=12000, help='synthetic assets in the index')
+    parser.add_argument('--runs', type=int, default=200, help='timed searches per query')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    app.symbol_index = app.build_symbol_index(synthetic_names(args.assets))
+    print(f"{'build index':<20} {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            app.search_symbols(query, 10)
+            timings.append(time.perf_counter() - started)
+        print(f"{query!r:<20} median {statistics.median(timings) * 1000:6.3f} ms   "
+              f"max {max(timings) * 1000:6.3f} ms")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for Portfolio Insight AI
+
+Measures how long a fresh interpreter takes to import app.py, and how long
+the deferred modules take to load, so cold-start regressions are easy to spot.
+
+Usage:
+    python bench_startup.py [--runs N]
+"""
+
+import sys
+import argparse
+import statistics
+import subprocess
+
+IMPORT_APP = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+IMPORT_DEFERRED = (
+    "import time; t = time.perf_counter(); "
+    "import requests, numpy, alpaca.trading.client, alpaca.data.historical; "
+    "print(time.perf_counter() - t)"
+)
+
+def time_in_fresh_interpreter(code, runs):
+    """Run code in a new interpreter each time and collect its reported seconds"""
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+def report(label, timings):
+    print(f"{label:<28} median {statistics.median(timings) * 1000:8.1f} ms   "
+          f"min {min(timings) * 1000:8.1f} ms   ({len(timings)} runs)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure cold-start import times')
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters per measurement')
+    args = parser.parse_args()
+
+    report('import app', time_in_fresh_interpreter(IMPORT_APP, args.runs))
+    report('deferred modules (warm-up)', time_in_fresh_interpreter(IMPORT_DEFERRED, args.runs))
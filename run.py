@@ -11,48 +11,112 @@ Usage:
 
 import os
 import sys
+import site
+import glob
+import threading
 import subprocess
 
+def read_venv_config(venv_path):
+    """Parse pyvenv.cfg into a dict"""
+    config = {}
+    with open(os.path.join(venv_path, 'pyvenv.cfg')) as f:
+        for line in f:
+            key, sep, value = line.partition('=')
+            if sep:
+                config[key.strip()] = value.strip()
+    return config
+
 def activate_venv():
-    """Activate the virtual environment if not already active"""
-    venv_path = os.path.join(os.path.dirname(__file__), 'venv310')
-    venv_python = os.path.join(venv_path, 'Scripts', 'python.exe')
-    
-    if os.path.exists(venv_python):
-        # Check if we're already in the virtual environment
-        if not hasattr(sys, 'real_prefix') and not (hasattr(sys, 'base_prefix') and sys.base_prefix != sys.prefix):
-            # Not in virtual environment, restart with venv python
-            print("🔄 Activating virtual environment...")
-            subprocess.run([venv_python, __file__])
-            return True
-    else:
+    """Activate the virtual environment if not already active.
+
+    When this interpreter matches the venv's Python version its packages are
+    put on sys.path in-process; otherwise the script is re-run under the venv
+    interpreter (exec on POSIX, a waited-on child on Windows) so its compiled
+    wheels load under the right version.
+    """
+    venv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'venv310')
+
+    # Check if we're already in the virtual environment
+    if hasattr(sys, 'real_prefix') or (hasattr(sys, 'base_prefix') and sys.base_prefix != sys.prefix):
+        return True
+
+    if not os.path.exists(os.path.join(venv_path, 'pyvenv.cfg')):
         print("❌ Virtual environment not found. Please run: py -3.10 -m venv venv310")
         print("Then install dependencies: pip install -r requirements.txt")
         return False
-    return False
+
+    config = read_venv_config(venv_path)
+    venv_version = tuple(int(part) for part in config.get('version', '0.0').split('.')[:2])
+
+    # Windows layout first, then POSIX (lib/pythonX.Y/site-packages)
+    site_packages = [os.path.join(venv_path, 'Lib', 'site-packages')]
+    site_packages += glob.glob(os.path.join(venv_path, 'lib', 'python*', 'site-packages'))
+    site_packages = [path for path in site_packages if os.path.isdir(path)]
+
+    if sys.version_info[:2] == venv_version and site_packages:
+        print("🔄 Activating virtual environment...")
+        # Mirror include-system-site-packages = false: drop the base interpreter's packages
+        if config.get('include-system-site-packages', 'false').lower() != 'true':
+            system_site = set(site.getsitepackages()) | {site.getusersitepackages()}
+            sys.path[:] = [p for p in sys.path if p not in system_site]
+        previous_path = list(sys.path)
+        for path in site_packages:
+            site.addsitedir(path)
+        # Make venv packages win over anything else left on the path
+        sys.path[:] = [p for p in sys.path if p not in previous_path] + previous_path
+        return True
+
+    venv_python = os.path.join(venv_path, 'Scripts', 'python.exe')
+    if not os.path.exists(venv_python):
+        venv_python = os.path.join(venv_path, 'bin', 'python')
+    if not os.path.exists(venv_python):
+        print(f"❌ Virtual environment needs Python {config.get('version')}, but its interpreter was not found")
+        return False
+
+    print("🔄 Activating virtual environment...")
+    args = [venv_python, os.path.abspath(__file__)] + sys.argv[1:]
+    if os.name == 'nt':
+        # os.execv on Windows spawns a child and exits, detaching the server from the console
+        try:
+            sys.exit(subprocess.run(args).returncode)
+        except KeyboardInterrupt:
+            sys.exit(0)
+    # Different Python version: replace this process rather than spawning a child
+    os.execv(venv_python, args)
+
+def start_warm_up(app_module):
+    """Import deferred modules and connect clients in the background"""
+    def run():
+        try:
+            app_module.warm_up()
+        except Exception as e:
+            print(f"⚠️ Warm-up failed, clients will connect on first request: {e}")
+
+    threading.Thread(target=run, name='warm-up', daemon=True).start()
 
 if __name__ == '__main__':
-    # Try to activate virtual environment first
-    if activate_venv():
-        sys.exit(0)
-    
-    # If we get here, we're in the virtual environment
+    activate_venv()
+
     try:
-        from app import app
-        
-        print("🚀 Starting Portfolio Insight AI...")
-        print("📊 Dashboard will be available at: http://localhost:5000")
-        print("🔑 Configure your API keys in the Settings tab")
-        print("")
-        print("Press Ctrl+C to stop the server")
-        print("-" * 50)
-        
-        app.run(debug=True, host='0.0.0.0', port=5000)
-        
+        import app as app_module
+
+        # With debug=True the reloader parent only watches files; warm up the serving child
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            start_warm_up(app_module)
+        else:
+            print("🚀 Starting Portfolio Insight AI...")
+            print("📊 Dashboard will be available at: http://localhost:5000")
+            print("🔑 Configure your API keys in the Settings tab")
+            print("")
+            print("Press Ctrl+C to stop the server")
+            print("-" * 50)
+
+        app_module.app.run(debug=True, host='0.0.0.0', port=5000)
+
     except ImportError as e:
         print(f"❌ Import error: {e}")
         print("💡 Make sure you're in the virtual environment and dependencies are installed:")
         print("   .\\venv310\\Scripts\\activate")
         print("   pip install -r requirements.txt")
     except Exception as e:
-        print(f"❌ Error starting application: {e}") 
\ No newline at end of file
+        print(f"❌ Error starting application: {e}")
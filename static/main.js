@@ -2,8 +2,11 @@
 let appState = {
     isConfigured: false,
     portfolioData: null,
+    portfolioVersion: null,
     watchlistData: null,
     chatHistory: [],
+    conversationId: null,
+    citations: {}, // citation id -> { url, title, date }
     currentSort: { field: 'market_value', direction: 'desc' },
     selectedModel: 'sonar-deep-research', // Default to the deep research model
     autoRefreshInterval: null,
@@ -139,15 +142,31 @@ async function loadPortfolioData(showLoadingIndicator = false) {
             showLoading();
         }
         
-        const response = await fetch(getCacheBustingUrl('/api/portfolio'));
+        // Send the version we hold so the server can answer with 304 or a diff
+        const url = appState.portfolioVersion && appState.portfolioData
+            ? `/api/portfolio?since=${appState.portfolioVersion}`
+            : '/api/portfolio';
+        const response = await fetch(getCacheBustingUrl(url));
+        
+        if (response.status === 304) {
+            appState.lastRefreshTime = new Date();
+            console.log('Portfolio data unchanged');
+            return appState.portfolioData;
+        }
+        
         const data = await response.json();
         
         if (response.ok) {
-            appState.portfolioData = data;
+            appState.portfolioVersion = data.version || null;
             appState.lastRefreshTime = new Date();
-            updatePortfolioDisplay(data);
+            if (data.diff) {
+                applyPortfolioDiff(data);
+            } else {
+                appState.portfolioData = data;
+                updatePortfolioDisplay(data);
+            }
             console.log('Portfolio data refreshed successfully');
-            return data;
+            return appState.portfolioData;
         } else {
             throw new Error(data.error || 'Failed to load portfolio data');
         }
@@ -162,6 +181,24 @@ async function loadPortfolioData(showLoadingIndicator = false) {
     }
 }
 
+function applyPortfolioDiff(data) {
+    const diff = data.diff;
+    const portfolio = appState.portfolioData;
+    const removed = new Set(diff.removed);
+    const updates = new Map([...diff.changed, ...diff.added].map(p => [p.symbol, p]));
+    
+    portfolio.positions = portfolio.positions
+        .filter(p => !removed.has(p.symbol))
+        .map(p => updates.get(p.symbol) || p)
+        .concat(diff.added);
+    Object.assign(portfolio.account, diff.account);
+    portfolio.weights = Object.assign(portfolio.weights || {}, diff.weights);
+    removed.forEach(symbol => delete portfolio.weights[symbol]);
+    portfolio.last_updated = data.last_updated;
+    
+    updatePortfolioDisplay(portfolio, diff);
+}
+
 // Auto-refresh functionality
 function startAutoRefresh() {
     // Clear any existing interval
@@ -215,13 +252,16 @@ async function sendChatMessage(message) {
             body: JSON.stringify({
                 prompt: message,
                 model: appState.selectedModel,
-                chat_history: appState.chatHistory
+                chat_history: appState.chatHistory,
+                conversation_id: appState.conversationId
             })
         });
         
         const data = await response.json();
         
         if (response.ok) {
+            appState.conversationId = data.conversation_id || appState.conversationId;
+            await resolveCitations(data);
             return data;
         } else {
             throw new Error(data.error || 'Failed to get AI response');
@@ -232,6 +272,29 @@ async function sendChatMessage(message) {
     }
 }
 
+// Chat responses carry citation ids; details are only sent the first time a
+// conversation sees a source, so keep them and look up any we are missing.
+async function resolveCitations(data) {
+    if (!data.citations) {
+        return;
+    }
+    Object.assign(appState.citations, data.citation_details || {});
+    
+    const missing = data.citations.filter(id => !appState.citations[id]);
+    if (missing.length > 0) {
+        try {
+            const response = await fetch(`/api/citations?ids=${missing.join(',')}`);
+            const result = await response.json();
+            if (response.ok) {
+                Object.assign(appState.citations, result.citations);
+            }
+        } catch (error) {
+            console.error('Error resolving citations:', error);
+        }
+    }
+    data.search_results = data.citations.map(id => appState.citations[id] || {});
+}
+
 // UI update functions with null checks
 function updateConnectionStatus(status) {
     // Update Alpaca status with null checks
@@ -279,7 +342,7 @@ function updateConnectionStatus(status) {
     }
 }
 
-function updatePortfolioDisplay(data) {
+function updatePortfolioDisplay(data, diff = null) {
     // Update portfolio summary with null checks
     const totalValue = document.getElementById('total-portfolio-value');
     const availableCash = document.getElementById('available-cash');
@@ -313,8 +376,12 @@ function updatePortfolioDisplay(data) {
         syncStatus.textContent = 'Last sync successful • Real-time market data enabled';
     }
     
-    // Update holdings table
-    updateHoldingsTable(data.positions);
+    // Update holdings table, patching rows in place when only a diff arrived
+    if (diff) {
+        patchHoldingsTable(data.positions, diff);
+    } else {
+        updateHoldingsTable(data.positions);
+    }
 }
 
 function updateHoldingsTable(positions) {
@@ -340,8 +407,53 @@ function updateHoldingsTable(positions) {
         return;
     }
     
-    // Sort positions based on current sort state
-    const sortedPositions = [...positions].sort((a, b) => {
+    sortPositions(positions).forEach((p, index) => {
+        const row = document.createElement('tr');
+        row.dataset.symbol = p.symbol;
+        // Set alternating row backgrounds
+        row.className = holdingRowClass(index);
+        row.innerHTML = holdingRowHtml(p);
+        tbody.appendChild(row);
+    });
+    
+    updateSortIndicators();
+}
+
+// Apply a portfolio diff to the rendered table, touching only changed rows
+function patchHoldingsTable(positions, diff) {
+    const tbody = document.getElementById('holdings-table-body');
+    if (!tbody) return;
+    
+    const rows = new Map([...tbody.querySelectorAll('tr[data-symbol]')].map(row => [row.dataset.symbol, row]));
+    const sortedPositions = sortPositions(positions);
+    
+    // Row set or order changed: fall back to a full render
+    const orderChanged = diff.added.length > 0
+        || diff.removed.length > 0
+        || rows.size !== sortedPositions.length
+        || sortedPositions.some((p, index) => tbody.children[index] !== rows.get(p.symbol));
+    if (orderChanged) {
+        updateHoldingsTable(positions);
+        return;
+    }
+    
+    diff.changed.forEach(p => {
+        const row = rows.get(p.symbol);
+        if (row) {
+            row.innerHTML = holdingRowHtml(p);
+        }
+    });
+}
+
+function holdingRowClass(index) {
+    return index % 2 === 0 
+        ? 'bg-white hover:bg-gray-50' 
+        : 'bg-gray-50 hover:bg-gray-100';
+}
+
+// Sort positions based on current sort state
+function sortPositions(positions) {
+    return [...positions].sort((a, b) => {
         let aVal = a[appState.currentSort.field];
         let bVal = b[appState.currentSort.field];
         
@@ -360,36 +472,26 @@ function updateHoldingsTable(positions) {
             return bVal.localeCompare(aVal);
         }
     });
-    
-    sortedPositions.forEach((p, index) => {
-        const row = document.createElement('tr');
-        // Set alternating row backgrounds
-        row.className = index % 2 === 0 
-            ? 'bg-white hover:bg-gray-50' 
-            : 'bg-gray-50 hover:bg-gray-100';
-
-        row.innerHTML = `
-            <td class="px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900">
-                <a href="https://www.google.com/search?q=NASDAQ%3A+${p.symbol}" target="_blank" class="hover:underline">${p.symbol}</a>
-            </td>
-            <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500 overflow-hidden text-ellipsis" title="${p.company}">${p.company}</td>
-            <td class="px-6 py-4 whitespace-nowrap text-sm text-right text-gray-500">${formatNumber(p.quantity)}</td>
-            <td class="px-6 py-4 whitespace-nowrap text-sm text-right font-medium text-gray-900">${formatCurrency(p.market_value)}</td>
-            <td class="px-6 py-4 whitespace-nowrap text-sm text-right text-gray-500">${formatCurrency(p.avg_entry_price)}</td>
-            <td class="px-6 py-4 whitespace-nowrap text-sm text-right text-gray-500">${formatCurrency(p.cost_basis)}</td>
-            <td class="px-6 py-4 whitespace-nowrap text-sm text-right">${formatPercent(p.todays_pl_pc)}</td>
-            <td class="px-6 py-4 whitespace-nowrap text-sm text-right">${formatCurrencyWithColor(p.todays_pl)}</td>
-            <td class="px-6 py-4 whitespace-nowrap text-sm text-right">${formatPercent(p.total_pl_pc)}</td>
-            <td class="px-6 py-4 whitespace-nowrap text-sm text-right">${formatCurrencyWithColor(p.total_pl)}</td>
-            <td class="px-6 py-4 whitespace-nowrap text-sm text-center">
-                <button class="px-3 py-1 bg-red-600 text-white text-xs font-semibold rounded-md hover:bg-red-700 focus:outline-none focus:ring-2 focus:ring-red-500 focus:ring-offset-2">Liquidate</button>
-            </td>
-        `;
+}
 
-        tbody.appendChild(row);
-    });
-    
-    updateSortIndicators();
+function holdingRowHtml(p) {
+    return `
+        <td class="px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900">
+            <a href="https://www.google.com/search?q=NASDAQ%3A+${p.symbol}" target="_blank" class="hover:underline">${p.symbol}</a>
+        </td>
+        <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500 overflow-hidden text-ellipsis" title="${p.company}">${p.company}</td>
+        <td class="px-6 py-4 whitespace-nowrap text-sm text-right text-gray-500">${formatNumber(p.quantity)}</td>
+        <td class="px-6 py-4 whitespace-nowrap text-sm text-right font-medium text-gray-900">${formatCurrency(p.market_value)}</td>
+        <td class="px-6 py-4 whitespace-nowrap text-sm text-right text-gray-500">${formatCurrency(p.avg_entry_price)}</td>
+        <td class="px-6 py-4 whitespace-nowrap text-sm text-right text-gray-500">${formatCurrency(p.cost_basis)}</td>
+        <td class="px-6 py-4 whitespace-nowrap text-sm text-right">${formatPercent(p.todays_pl_pc)}</td>
+        <td class="px-6 py-4 whitespace-nowrap text-sm text-right">${formatCurrencyWithColor(p.todays_pl)}</td>
+        <td class="px-6 py-4 whitespace-nowrap text-sm text-right">${formatPercent(p.total_pl_pc)}</td>
+        <td class="px-6 py-4 whitespace-nowrap text-sm text-right">${formatCurrencyWithColor(p.total_pl)}</td>
+        <td class="px-6 py-4 whitespace-nowrap text-sm text-center">
+            <button class="px-3 py-1 bg-red-600 text-white text-xs font-semibold rounded-md hover:bg-red-700 focus:outline-none focus:ring-2 focus:ring-red-500 focus:ring-offset-2">Liquidate</button>
+        </td>
+    `;
 }
 
 function updateSortIndicators() {
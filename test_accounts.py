@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for merging positions across account profiles
+"""
+
+import sys
+from types import SimpleNamespace
+
+import app
+from app import merge_positions
+
+def position(symbol, qty, market_value, cost_basis, todays_pl=0.0, total_pl=None):
+    """Alpaca-style position with string fields"""
+    return SimpleNamespace(
+        symbol=symbol, qty=str(qty), market_value=str(market_value), cost_basis=str(cost_basis),
+        unrealized_intraday_pl=str(todays_pl),
+        unrealized_pl=str(market_value - cost_basis if total_pl is None else total_pl)
+    )
+
+def merge(*positions_by_account):
+    # A loaded asset cache keeps company lookups offline
+    app.asset_cache_built = True
+    app.asset_name_cache = {'AAPL': 'Apple Inc.', 'MSFT': 'Microsoft Corporation'}
+    return {p['symbol']: p for p in merge_positions(positions_by_account)}
+
+def test_average_cost_is_weighted_by_quantity():
+    """10 shares at 100 and 30 at 150 average to 137.50"""
+    merged = merge(
+        ('main', [position('AAPL', 10, 1600.0, 1000.0)]),
+        ('ira', [position('AAPL', 30, 4800.0, 4500.0)])
+    )['AAPL']
+
+    assert merged['quantity'] == 40
+    assert merged['avg_entry_price'] == 137.5
+    assert merged['current_price'] == 160.0
+    assert merged['cost_basis'] == 5500.0
+    assert merged['total_pl'] == 900.0
+    assert [a['account'] for a in merged['accounts']] == ['main', 'ira']
+
+def test_shorts_net_against_longs():
+    """A short in one account offsets a long in another"""
+    merged = merge(
+        ('main', [position('MSFT', 10, 4000.0, 3500.0)]),
+        ('hedge', [position('MSFT', -4, -1600.0, -1700.0)])
+    )['MSFT']
+
+    assert merged['quantity'] == 6
+    assert merged['market_value'] == 2400.0
+    assert merged['current_price'] == 400.0
+    assert merged['total_pl'] == 600.0
+
+    flat = merge(
+        ('main', [position('MSFT', 5, 2000.0, 1800.0)]),
+        ('hedge', [position('MSFT', -5, -2000.0, -1900.0)])
+    )['MSFT']
+    assert flat['quantity'] == 0
+    assert flat['current_price'] == 0.0 and flat['avg_entry_price'] == 0.0
+
+def test_todays_pl_percent_uses_start_of_day_value():
+    """Today's P/L % is relative to the combined value at the open, not the current value"""
+    merged = merge(
+        ('main', [position('AAPL', 10, 1100.0, 1000.0, todays_pl=100.0)]),
+        ('ira', [position('AAPL', 10, 1100.0, 1000.0, todays_pl=100.0)])
+    )['AAPL']
+
+    # Started the day at 2000, up 200
+    assert merged['todays_pl'] == 200.0
+    assert merged['todays_pl_pc'] == 10.0
+    assert merged['total_pl_pc'] == 10.0
+
+def test_positions_sorted_by_value():
+    """Largest combined holding comes first"""
+    merged = merge(('main', [position('AAPL', 1, 100.0, 90.0), position('MSFT', 1, 400.0, 300.0)]))
+    assert list(merged) == ['MSFT', 'AAPL']
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 All account merge tests passed!")
+    sys.exit(0)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for the array-backed position table and incremental portfolio diffs
+"""
+
+import sys
+from types import SimpleNamespace
+
+import app
+from app import build_position_table, update_position_prices, record_portfolio_snapshot, build_portfolio_diff
+
+def make_positions():
+    """Three long positions with prices that differ from yesterday's close"""
+    return [
+        SimpleNamespace(symbol=symbol, qty=qty, current_price=price, avg_entry_price=entry,
+                        cost_basis=qty * entry, lastday_price=price - 1)
+        for symbol, qty, price, entry in [('AAPL', 10, 200.0, 150.0), ('MSFT', 5, 400.0, 300.0), ('NVDA', 20, 100.0, 50.0)]
+    ]
+
+def make_table(positions):
+    import numpy as np
+    # A loaded asset cache keeps company lookups offline
+    app.asset_cache_built = True
+    app.asset_name_cache = {'AAPL': 'Apple Inc.', 'MSFT': 'Microsoft Corporation', 'NVDA': 'NVIDIA Corporation'}
+    return build_position_table(positions, np.array([p.current_price for p in positions], dtype=float))
+
+def snapshot_of(table):
+    weights = dict(zip(table['symbols'], table['weight_pc'].round(2).tolist()))
+    return dict(zip(table['symbols'], table['row_hashes'])), weights
+
+def test_rows_do_not_carry_weights():
+    """Portfolio-relative weights stay out of the hashed row dicts"""
+    table = make_table(make_positions())
+    assert all('weight_pc' not in row for row in table['rows'])
+    assert abs(table['weight_pc'].sum() - 100.0) < 1e-9
+
+def test_single_tick_changes_single_row():
+    """A price move on one symbol re-hashes only that row, though every weight shifts"""
+    table = make_table(make_positions())
+    hashes_before = list(table['row_hashes'])
+    weights_before = table['weight_pc'].copy()
+
+    changed = update_position_prices(table, {'AAPL': 210.0, 'MSFT': 400.0, 'NVDA': 100.0})
+
+    assert list(changed) == [0]
+    assert table['row_hashes'][0] != hashes_before[0]
+    assert table['row_hashes'][1:] == hashes_before[1:]
+    assert (table['weight_pc'] != weights_before).all()
+
+def test_diff_lists_only_the_ticked_row():
+    """The incremental response sends one changed row and the weights separately"""
+    table = make_table(make_positions())
+    row_hashes, weights = snapshot_of(table)
+    account = {'total_value': 10000.0, 'cash': 1000.0}
+    old_snapshot, _ = record_portfolio_snapshot(account, row_hashes, weights)
+
+    update_position_prices(table, {'AAPL': 210.0})
+    row_hashes, weights = snapshot_of(table)
+    snapshot, previous = record_portfolio_snapshot(account, row_hashes, weights, old_snapshot['version'])
+    diff = build_portfolio_diff(previous, snapshot, account, table['rows'])
+
+    assert snapshot['version'] != old_snapshot['version']
+    assert [p['symbol'] for p in diff['changed']] == ['AAPL']
+    assert diff['added'] == [] and diff['removed'] == []
+    assert diff['account'] == {}
+    assert set(diff['weights']) == {'AAPL', 'MSFT', 'NVDA'}
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 All position table tests passed!")
+    sys.exit(0)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the citation store and per-symbol research browsing
+"""
+
+import os
+import sys
+import tempfile
+from contextlib import closing
+
+import app
+
+def use_temp_db():
+    """Point the research store at a fresh database file"""
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    os.remove(path)
+    app.RESEARCH_DB = path
+    app.research_db_ready = False
+    return path
+
+def restore_db(path):
+    os.remove(path)
+    app.RESEARCH_DB = 'research.db'
+    app.research_db_ready = False
+
+def add_link(conn, cid, symbol, conversation_id, seen_at):
+    conn.execute(
+        "INSERT OR IGNORE INTO citations (id, url, first_seen, last_seen) VALUES (?, ?, ?, ?)",
+        (cid, f"https://example.com/{cid}", seen_at, seen_at)
+    )
+    conn.execute(
+        "INSERT INTO citation_links (citation_id, symbol, conversation_id, seen_at) VALUES (?, ?, ?, ?)",
+        (cid, symbol, conversation_id, seen_at)
+    )
+
+def test_normalize_url_collapses_equivalent_urls():
+    """Scheme, www, tracking params, fragments, query order and trailing slashes do not matter"""
+    canonical = app.normalize_url('https://example.com/news/a?id=1&page=2')
+    for url in [
+        'http://www.example.com/news/a/?page=2&id=1',
+        'https://EXAMPLE.com/news/a?id=1&page=2&utm_source=feed&utm_medium=rss',
+        'https://example.com/news/a?fbclid=abc&id=1&page=2#comments',
+        ' https://www.example.com:443/news/a/?id=1&page=2 '
+    ]:
+        assert app.normalize_url(url) == canonical, url
+        assert app.citation_id_for(url) == app.citation_id_for(canonical)
+
+def test_normalize_url_keeps_meaningful_differences():
+    """Different paths, query values, hosts or ports stay distinct"""
+    base = app.normalize_url('https://example.com/news/a?id=1')
+    for url in [
+        'https://example.com/news/b?id=1',
+        'https://example.com/news/a?id=2',
+        'https://news.example.com/news/a?id=1',
+        'https://example.com:8443/news/a?id=1'
+    ]:
+        assert app.normalize_url(url) != base, url
+    assert app.normalize_url('https://example.com/') == app.normalize_url('https://example.com') == 'https://example.com/'
+
+def test_research_pages_never_repeat_a_citation():
+    """A source linked on two dates appears once, at its latest link time"""
+    path = use_temp_db()
+    try:
+        with closing(app.get_research_db()) as conn, conn:
+            add_link(conn, 'multi', 'AAPL', 'c1', '2026-01-01T00:00:00')
+            add_link(conn, 'multi', 'AAPL', 'c2', '2026-01-03T00:00:00')
+            add_link(conn, 'middle', 'AAPL', 'c1', '2026-01-02T00:00:00')
+            add_link(conn, 'oldest', 'AAPL', 'c1', '2025-12-31T00:00:00')
+            add_link(conn, 'other', 'MSFT', 'c1', '2026-01-04T00:00:00')
+
+        client = app.app.test_client()
+        seen = []
+        before = None
+        while True:
+            url = '/api/research/aapl?limit=1' + (f'&before={before}' if before else '')
+            citations = client.get(url).get_json()['citations']
+            if not citations:
+                break
+            seen.extend((c['id'], c['linked_at']) for c in citations)
+            before = citations[-1]['linked_at']
+
+        assert seen == [
+            ('multi', '2026-01-03T00:00:00'),
+            ('middle', '2026-01-02T00:00:00'),
+            ('oldest', '2025-12-31T00:00:00')
+        ], seen
+    finally:
+        restore_db(path)
+
+def test_record_citations_returns_each_source_once():
+    """Results that normalize to the same URL yield one id and one detail"""
+    path = use_temp_db()
+    try:
+        ids, details = app.record_citations([
+            {'url': 'https://x.com/a', 'title': 'A'},
+            {'url': 'https://www.x.com/a/', 'title': 'A again'},
+            {'url': 'https://x.com/b', 'title': 'B'}
+        ], ['AAPL'], 'c1')
+
+        assert ids == [app.citation_id_for('https://x.com/a'), app.citation_id_for('https://x.com/b')]
+        assert list(details) == ids
+
+        # The same sources in the same conversation are no longer new
+        again, new_details = app.record_citations([{'url': 'http://x.com/a?utm_source=feed'}], ['AAPL'], 'c1')
+        assert again == ids[:1] and new_details == {}
+    finally:
+        restore_db(path)
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 All research tests passed!")
+    sys.exit(0)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for symbol search ranking
+"""
+
+import sys
+
+import app
+from app import build_symbol_index, search_symbols
+
+NAMES = {
+    'A': 'Agilent Technologies Inc.',
+    'AA': 'Alcoa Corp',
+    'AAPL': 'Apple Inc.',
+    'APLE': 'Apple Hospitality REIT Inc.',
+    'MSFT': 'Microsoft Corporation',
+    'GOOG': 'Alphabet Inc. Class C Capital Stock',
+    'GOOGL': 'Alphabet Inc. Class A Common Stock',
+    'BRK.B': 'Berkshire Hathaway Inc. Class B',
+    'BRK.A': 'Berkshire Hathaway Inc. Class A'
+}
+
+def search(query, limit=10):
+    app.symbol_index = build_symbol_index(NAMES)
+    return [result['symbol'] for result in search_symbols(query, limit)]
+
+def test_exact_ticker_then_prefix_then_name():
+    """An exact ticker leads, longer tickers with that prefix follow, then name matches"""
+    assert search('A') == ['A', 'AA', 'AAPL', 'APLE']
+    assert search('AAPL') == ['AAPL']
+    assert search('apple') == ['AAPL', 'APLE']
+    # Ticker prefix AP ranks ahead of names starting with "Ap..."
+    assert search('ap') == ['APLE', 'AAPL']
+
+def test_ticker_separators_are_ignored():
+    """BRK.B is found as BRK B, BRK-B or BRKB"""
+    for query in ['BRK.B', 'brk b', 'BRK-B', 'brkb']:
+        assert search(query)[0] == 'BRK.B', query
+
+def test_multi_word_requires_every_word():
+    """Each query word must start some word of the name"""
+    assert search('apple hosp') == ['APLE']
+    assert search('apple microsoft') == []
+
+def test_multi_word_scores_later_words():
+    """Whole-word matches on later words outrank a better first-word rank"""
+    assert search('alphabet class a') == ['GOOGL', 'GOOG']
+    assert search('alphabet class c') == ['GOOG', 'GOOGL']
+    assert search('berkshire class') == ['BRK.A', 'BRK.B']
+    assert search('berkshire class b') == ['BRK.B', 'BRK.A']
+    assert search('berkshire class a') == ['BRK.A']
+
+def test_limit_is_respected():
+    """No more than limit results come back"""
+    assert len(search('a', limit=2)) == 2
+    assert len(search('inc class', limit=3)) == 3
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 All search tests passed!")
+    sys.exit(0)
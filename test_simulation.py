@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the what-if simulation math and request validation
+"""
+
+import sys
+
+import numpy as np
+
+from app import app, simulate_rebalance, parse_number_map, parse_scenarios
+
+def test_rebalance_long_sell_realizes_gain():
+    """Selling part of a long position realizes (price - average cost) per share"""
+    quantities = np.array([10.0])
+    prices = np.array([100.0])
+    cost_basis = np.array([800.0])  # average cost 80
+
+    result = simulate_rebalance(quantities, prices, cost_basis, 0.0, np.array([0.5]))
+
+    assert result['trade_quantities'][0] == -5.0
+    assert result['realized_pl'][0] == 100.0
+    assert result['new_cash'] == 500.0
+    assert result['new_weights'][0] == 0.5
+
+def test_rebalance_short_cover_realizes_gain():
+    """Buying back a short below its entry price realizes a gain"""
+    quantities = np.array([10.0, -5.0])
+    prices = np.array([100.0, 50.0])
+    cost_basis = np.array([800.0, -300.0])  # short entered at 60
+
+    result = simulate_rebalance(quantities, prices, cost_basis, 1000.0, np.array([0.25, 0.0]))
+
+    assert result['total_value'] == 1750.0
+    assert result['trade_quantities'][1] == 5.0
+    assert result['new_quantities'][1] == 0.0
+    assert result['realized_pl'][1] == 50.0
+    # Long leg: 10 -> 4.375 shares, selling 5.625 at a 20 gain each
+    assert result['realized_pl'][0] == 112.5
+
+def test_rebalance_buys_realize_nothing():
+    """Adding to a long or opening a new position does not realize P/L"""
+    quantities = np.array([10.0, 0.0])
+    prices = np.array([100.0, 20.0])
+    cost_basis = np.array([800.0, 0.0])
+
+    result = simulate_rebalance(quantities, prices, cost_basis, 1000.0, np.array([0.6, 0.4]))
+
+    assert (result['trade_quantities'] > 0).all()
+    assert (result['realized_pl'] == 0).all()
+    assert result['new_cash'] == 0.0
+
+def test_rebalance_turnover_is_one_way():
+    """Turnover is half the gross traded value over portfolio value"""
+    quantities = np.array([10.0, 0.0])
+    prices = np.array([100.0, 50.0])
+    cost_basis = np.array([1000.0, 0.0])
+
+    # Swap the whole position into the other symbol: 1000 sold + 1000 bought
+    result = simulate_rebalance(quantities, prices, cost_basis, 0.0, np.array([0.0, 1.0]))
+
+    assert result['turnover'] == 1.0
+
+    unchanged = simulate_rebalance(quantities, prices, cost_basis, 0.0, np.array([1.0, 0.0]))
+    assert unchanged['turnover'] == 0.0
+
+def test_parse_number_map_rejects_non_numbers():
+    """Non-numeric or non-object input raises ValueError"""
+    assert parse_number_map({'aapl': -0.2}, 'shocks') == {'AAPL': -0.2}
+    for bad in [{'AAPL': 'x'}, {'AAPL': True}, {'AAPL': float('nan')}, ['AAPL'], 'AAPL']:
+        try:
+            parse_number_map(bad, 'shocks')
+        except ValueError:
+            continue
+        raise AssertionError(f'accepted {bad!r}')
+
+def test_parse_scenarios_validates_types():
+    """Scenario settings must be an object with numeric sizes"""
+    grid = parse_scenarios({'type': 'grid', 'steps': 5, 'symbols': ['aapl']})
+    assert grid['steps'] == 5 and grid['symbols'] == ['AAPL']
+    for bad in [True, [], {'type': 'nope'}, {'steps': 'many'}, {'symbols': [1]}, {'type': 'monte_carlo', 'seed': 'x'}]:
+        try:
+            parse_scenarios(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f'accepted {bad!r}')
+
+def test_simulate_endpoint_returns_400_for_bad_input():
+    """Bad client input is rejected before any Alpaca call"""
+    client = app.test_client()
+    for body in [{'shocks': {'AAPL': 'x'}}, {'scenarios': True}, {'target_weights': [0.5]}, [1, 2]]:
+        response = client.post('/api/portfolio/simulate', json=body)
+        assert response.status_code == 400, body
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print("🎉 All simulation tests passed!")
+    sys.exit(0)